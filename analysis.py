@@ -0,0 +1,234 @@
+# analysis.py
+
+import re
+import json
+from dotenv import load_dotenv
+
+import intent_rules
+import intent_knn
+import news_index
+import skills
+import transport
+import llm
+import exit as exit_intent
+from exit import normalize_input
+
+# Load environment variables
+load_dotenv()
+
+# Shared Groq client on the process-wide connection pool
+client = transport.get_groq_client()
+
+MODEL_NAME = "llama-3.3-70b-versatile"
+
+# Local contact/topic extraction for turns routed without the LLM
+CONTACT_PATTERNS = [
+    # "send a whatsapp message to John", "send a text to my mom"
+    re.compile(r"\b(?:message|text|whatsapp|write|send(?:\s+it)?)\b.*?\bto\s+((?:my\s+)?[a-z][\w'-]*(?-i:\s+[A-Z][\w'-]*)?)", re.IGNORECASE),
+    # "text John", "message Sarah on whatsapp"
+    re.compile(r"\b(?:text|message|ping)\s+(?!me\b|to\b|a\b|an\b|the\b)([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?)"),
+]
+GENERIC_CONTACTS = {"someone", "somebody", "anyone", "anybody", "everyone", "everybody",
+                    "him", "her", "them", "me", "us", "it", "people"}
+# The topic must hang off a news/note word: "turn on the news" or "what's going on" carry no topic
+TOPIC_PATTERNS = {
+    "news": re.compile(r"\b(?:news|headlines?|stories|updates?)\b.*?\b(?:about|on|regarding|related to)\s+(.+)$", re.IGNORECASE),
+    "notepad": re.compile(r"\b(?:notes?|document|essay|letter|paragraph|something)\b.*?\b(?:about|on|regarding)\s+(.+)$", re.IGNORECASE),
+}
+LEADING_WORDS = re.compile(r"^(?:(?:the|a|an|some|any|about|on|in|of|for|to)\s+)+", re.IGNORECASE)
+TRAILING_FILLERS = re.compile(r"(?:(?:^|\s+)(?:please|now|today|for me))+$", re.IGNORECASE)
+SLOT_CATEGORIES = {"whatsapp": "contact", "news": "topic", "notepad": "topic"}
+
+
+
+def parse_level_change(user_input):
+    """
+    Parses user input for numeric values (e.g., "set brightness to 50%")
+    and determines increase or decrease actions.
+    Returns (change_value, set_value).
+    Example:
+      "increase brightness by 10" -> (10, None)
+      "decrease volume" -> (-10, None)
+      "set brightness to 70" -> (None, 70)
+    """
+    user_input = user_input.lower()
+    change_value = None
+    set_value = None
+
+    if "increase" in user_input or "up" in user_input:
+        match = re.search(r'\d+', user_input)
+        change_value = int(match.group()) if match else 10
+    elif "decrease" in user_input or "down" in user_input:
+        match = re.search(r'\d+', user_input)
+        change_value = -int(match.group()) if match else -10
+    elif "set" in user_input:
+        match = re.search(r'\d+', user_input)
+        set_value = int(match.group()) if match else 50
+
+    return change_value, set_value
+
+
+def extract_slots(user_input):
+    """Extract the slots that can be parsed locally: level change/set and mute."""
+    change, set_value = parse_level_change(user_input)
+    lowered = user_input.lower()
+    return {
+        "change": change,
+        "set": set_value,
+        "mute": "mute" in lowered or "silent" in lowered,
+        "contact": None,
+        "topic": None,
+    }
+
+
+def extract_contact(user_input):
+    """Contact name from "message/text ... to <Name>" phrasings, or None."""
+    text = user_input.strip().rstrip(".!?")
+    for pattern in CONTACT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            contact = match.group(1).strip()
+            # "send a message to someone" names nobody; let the skill ask
+            return None if contact.lower() in GENERIC_CONTACTS else contact
+    return None
+
+
+def extract_topic(user_input, category="news"):
+    """Topic from "news about <topic>" / "a note on <topic>" phrasings, or None."""
+    match = TOPIC_PATTERNS[category].search(user_input.strip().rstrip(".!?"))
+    if not match:
+        return None
+    topic = TRAILING_FILLERS.sub("", match.group(1)).strip(" ,")
+    topic = LEADING_WORDS.sub("", topic)
+    if category == "news":
+        # Same cleaning news_mode applies; the news module is loaded here anyway
+        topic = skills.get("news", "clean_query")(topic)
+    # Nothing left but stopwords or news words ("the latest", "today's headlines")
+    if not news_index.tokenize(topic):
+        return None
+    return topic
+
+
+def fill_local_slots(user_input, category, slots):
+    """Fill the contact/topic slot of a locally routed turn."""
+    slot = SLOT_CATEGORIES.get(category)
+    if slot == "contact":
+        slots["contact"] = extract_contact(user_input)
+    elif slot == "topic":
+        slots["topic"] = extract_topic(user_input, category)
+    return slots
+
+
+def analyze_with_llm(user_input):
+    """
+    One structured LLM call that returns exit intent, category and contact/topic slots.
+    Returns the parsed JSON dict, or None if the call or parsing failed.
+    """
+    prompt = f"""
+You analyze a single voice command for the assistant AERO and return ONLY a JSON object with these keys:
+  "exit": true if the user wants to stop or quit AERO itself (NOT closing other apps/windows), else false.
+  "category": one of {json.dumps(intent_rules.VALID_CATEGORIES)}.
+  "contact": the person to message for WhatsApp requests, else null.
+  "topic": the subject for news or note requests, else null.
+
+Category guide:
+- Calendar events, appointments, scheduling -> "google_calendar"
+- Meetings, zoom, calls, conferences -> "meeting"
+- Mental health/emotional support -> "therapy"
+- Note-taking/document creation -> "notepad"
+- WhatsApp or sending a message -> "whatsapp"
+- Screen brightness -> "brightness"
+- Volume control -> "volume"
+- Data visualization -> "visualize"
+- Closing other apps -> "close_active_apps"
+- News and headlines -> "news"
+- Opening or finding files -> "retrive-file"
+- None of the above -> "general"
+
+Examples:
+"stop" -> {{"exit": true, "category": "general", "contact": null, "topic": null}}
+"never mind" -> {{"exit": false, "category": "general", "contact": null, "topic": null}}
+"close all apps" -> {{"exit": false, "category": "close_active_apps", "contact": null, "topic": null}}
+"send a whatsapp message to John" -> {{"exit": false, "category": "whatsapp", "contact": "John", "topic": null}}
+"what's the news about tesla" -> {{"exit": false, "category": "news", "contact": null, "topic": "tesla"}}
+
+User input: "{user_input}"
+"""
+    try:
+        content = llm.complete_text(
+            client,
+            site="analysis",
+            model=MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.0,
+            max_tokens=60,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(content)
+    except Exception as e:
+        print(f"ERROR in analyze_with_llm: {e}")
+        return None
+
+
+def analyze_utterance(user_input):
+    """
+    Single analysis stage for a turn: exit intent, category and slots.
+
+    Returns:
+        dict: {"exit": bool, "category": str, "slots": {...}, "source": "rules" | "knn" | "llm" | "fallback"}
+    """
+    clean_input = normalize_input(user_input)
+    slots = extract_slots(user_input)
+    rule = intent_rules.match(user_input)
+
+    if not clean_input:
+        return {"exit": False, "category": "general", "slots": slots, "source": "rules"}
+
+    # Clear exits and clear non-exits are decided locally; only ambiguous ones need the LLM
+    exit_decision = exit_intent.detect_exit(user_input, escalate=False, top_level=True)
+    if exit_decision.is_exit:
+        result = {"exit": True, "category": "general", "slots": slots, "source": "rules"}
+        print(f"DEBUG: analyze_utterance -> {result}")
+        return result
+
+    if rule.confidence >= intent_rules.CONFIDENT and exit_decision.source != "undecided":
+        intent_rules.STATS["fast_path"] += 1
+        fill_local_slots(user_input, rule.category, slots)
+        result = {"exit": False, "category": rule.category, "slots": slots, "source": "rules"}
+        print(f"DEBUG: analyze_utterance -> {result}")
+        return result
+
+    # Second local stage: nearest-neighbour vote against the labeled exemplar bank
+    if exit_decision.source != "undecided":
+        knn_category = intent_knn.predict(user_input)
+        if knn_category is not None:
+            fill_local_slots(user_input, knn_category, slots)
+            result = {"exit": False, "category": knn_category, "slots": slots, "source": "knn"}
+            print(f"DEBUG: analyze_utterance -> {result}")
+            return result
+
+    intent_rules.STATS["llm"] += 1
+    parsed = analyze_with_llm(user_input)
+    if parsed is None:
+        # Same keyword fallbacks the separate classifiers used when the API failed
+        is_exit = exit_intent.keyword_exit_match(clean_input)
+        category = rule.category or "general"
+        source = "fallback"
+    else:
+        is_exit = parsed.get("exit") is True
+        category = intent_rules.resolve(rule, str(parsed.get("category") or "").strip().lower())
+        slots["contact"] = parsed.get("contact") or None
+        slots["topic"] = parsed.get("topic") or None
+        source = "llm"
+        if not is_exit:
+            intent_knn.add_example(user_input, category)  # Learn from the LLM for the rest of the session
+
+    result = {"exit": is_exit, "category": category, "slots": slots, "source": source}
+    print(f"DEBUG: analyze_utterance -> {result}")
+    return result
+
+
+# Example usage (optional, for testing this file directly)
+if __name__ == '__main__':
+    for phrase in ["turn the volume up to 40", "stop", "send a message to Sarah", "tell me a joke"]:
+        print(f"'{phrase}' -> {analyze_utterance(phrase)}")
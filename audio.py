@@ -1,13 +1,20 @@
 import os
+import io
+import re
+import time
+import queue
 import wave
 import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 import pyaudio
 import webrtcvad
-import numpy as np
 from dotenv import load_dotenv
-from groq import Groq  # Groq SDK for transcription
-from deepgram import DeepgramClient, SpeakOptions # Import Deepgram specifics
-import pygame # Import pygame for playback
+import transport  # Shared Groq clients on a pooled HTTP connection
+import tts_cache
+import capture
+import endpointing
 
 # Load Environment Variables
 load_dotenv()
@@ -17,98 +24,362 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not found in environment variables.")
 # Initialize Groq Client for transcription tasks
-groq_client = Groq(api_key=GROQ_API_KEY)
+groq_client = transport.get_groq_client()
+
+# Optional Whisper-compatible endpoint (e.g. a local stand-in server for testing)
+WHISPER_BASE_URL = os.getenv("WHISPER_BASE_URL")
+transcription_client = transport.get_groq_client(WHISPER_BASE_URL) if WHISPER_BASE_URL else groq_client
+WHISPER_MODEL = "whisper-large-v3-turbo"
 # --- End Groq Initialization ---
 
-# --- Deepgram Initialization (for TTS) ---
-DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
-if not DEEPGRAM_API_KEY:
-    raise ValueError("DEEPGRAM_API_KEY not found in environment variables.")
-# Initialize Deepgram Client globally for TTS tasks
-try:
-    deepgram_client = DeepgramClient(DEEPGRAM_API_KEY)
-except Exception as e:
-    print(f"🚨 Failed to initialize Deepgram client: {e}")
-    raise # Stop execution if Deepgram client fails
+# --- Streaming Transcription Settings ---
+# When enabled, speech is kept in memory and uploaded segment by segment while the
+# user is still talking, so only the last short segment is pending at end of speech.
+STREAMING_TRANSCRIPTION = os.getenv("STREAMING_TRANSCRIPTION", "1") != "0"
+SEGMENT_PAUSE_SECONDS = 0.4   # Pause inside speech that may close a segment
+MIN_SEGMENT_SECONDS = 1.5     # Don't ship segments shorter than this mid-utterance
+MAX_SEGMENT_SECONDS = 8.0     # Force a cut if the user never pauses
+PREROLL_SECONDS = 0.2         # Silence kept before the first speech frame
+
+# The mic stays open for the whole session; each listen() starts this far in the past
+CAPTURE_PREROLL_SECONDS = float(os.getenv("CAPTURE_PREROLL_SECONDS", "0.3"))
+_capture_service = None
+
+# Metrics of the last end-of-speech decision (see endpointing.Endpointer)
+LAST_ENDPOINT_METRICS = {}
+
+# Segments are transcribed in the background while capture continues
+_transcription_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="whisper")
+# --- End Streaming Transcription Settings ---
+
+# --- TTS Playback Settings ---
+TTS_MODEL = "playai-tts"
+TTS_VOICE = "Fritz-PlayAI"
+TTS_CHUNK_BYTES = 4096
+
+# One PyAudio instance and one output stream are kept for the whole session
+_pyaudio = None
+_output_stream = None
+_output_format = None
+_output_lock = threading.Lock()
+
+# Playback state for echo guards: the mic should not treat our own speech as user input
+PLAYBACK_STATE = {"playing": False, "started_at": 0.0, "ended_at": 0.0}  # perf_counter seconds
+
+# Timing of the most recent speak() call, in milliseconds
+LAST_SPEAK_METRICS = {"time_to_first_audio_ms": None, "total_ms": None}
+
+# Sentence streaming: boundaries at ., ! or ? followed by whitespace, or at newlines
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+MIN_SENTENCE_CHARS = 20  # Very short sentences are merged with the next one
+_synthesis_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+# --- End TTS Playback Settings ---
+
+
+def get_pyaudio():
+    """Return the process-wide PyAudio instance, creating it on first use."""
+    global _pyaudio
+    if _pyaudio is None:
+        _pyaudio = pyaudio.PyAudio()
+    return _pyaudio
+
+
+def get_output_stream(rate, channels, sample_width):
+    """Return the persistent output stream, reopening it only if the audio format changes."""
+    global _output_stream, _output_format
+    audio_format = (rate, channels, sample_width)
+    if _output_stream is None or _output_format != audio_format:
+        if _output_stream is not None:
+            _output_stream.stop_stream()
+            _output_stream.close()
+        p = get_pyaudio()
+        _output_stream = p.open(format=p.get_format_from_width(sample_width),
+                                channels=channels,
+                                rate=rate,
+                                output=True)
+        _output_format = audio_format
+    return _output_stream
+
+
+def iter_wav_pcm(byte_chunks):
+    """
+    Parse a WAV byte stream incrementally.
+
+    Yields (rate, channels, sample_width, pcm_bytes) as soon as each chunk of sample
+    data arrives. PCM is always cut on whole-frame boundaries. Streamed WAV headers
+    often carry a placeholder data size, so the data chunk is read until the stream ends.
+    """
+    buffer = b''
+    riff_checked = False
+    audio_format = None
+    block_align = 2
+    in_data = False
+
+    for chunk in byte_chunks:
+        buffer += chunk
+        if not riff_checked:
+            if len(buffer) < 12:
+                continue
+            if buffer[:4] != b'RIFF' or buffer[8:12] != b'WAVE':
+                raise ValueError("TTS response is not a WAV stream.")
+            buffer = buffer[12:]
+            riff_checked = True
+
+        while not in_data and len(buffer) >= 8:
+            chunk_id = buffer[:4]
+            chunk_size = int.from_bytes(buffer[4:8], 'little')
+            if chunk_id == b'data':
+                if audio_format is None:
+                    raise ValueError("WAV stream has no fmt chunk before its data.")
+                buffer = buffer[8:]
+                in_data = True
+                break
+            if len(buffer) < 8 + chunk_size:
+                break  # Wait for the rest of this header chunk
+            if chunk_id == b'fmt ':
+                channels = int.from_bytes(buffer[10:12], 'little')
+                rate = int.from_bytes(buffer[12:16], 'little')
+                block_align = int.from_bytes(buffer[20:22], 'little')
+                bits = int.from_bytes(buffer[22:24], 'little')
+                audio_format = (rate, channels, bits // 8)
+            buffer = buffer[8 + chunk_size + (chunk_size & 1):]
+
+        if in_data:
+            usable = len(buffer) - len(buffer) % block_align
+            if usable:
+                yield (*audio_format, buffer[:usable])
+                buffer = buffer[usable:]
+
+
+def play_pcm_chunks(pcm_chunks, started_at=None):
+    """
+    Write (rate, channels, sample_width, pcm) chunks to the persistent output stream.
+    Returns the time to first audio in milliseconds (measured from started_at).
+    """
+    started_at = started_at or time.perf_counter()
+    time_to_first_audio = None
+    with _output_lock:
+        try:
+            for rate, channels, sample_width, pcm in pcm_chunks:
+                stream = get_output_stream(rate, channels, sample_width)
+                if time_to_first_audio is None:
+                    time_to_first_audio = (time.perf_counter() - started_at) * 1000
+                    PLAYBACK_STATE["playing"] = True
+                    PLAYBACK_STATE["started_at"] = time.perf_counter()
+                stream.write(pcm)
+        finally:
+            if PLAYBACK_STATE["playing"]:
+                PLAYBACK_STATE["playing"] = False
+                PLAYBACK_STATE["ended_at"] = time.perf_counter()
+    return time_to_first_audio
+
+
+def is_playing():
+    """True while audio is being written to the output stream."""
+    return PLAYBACK_STATE["playing"]
+
+
+def seconds_since_playback():
+    """Seconds since the last playback ended (0 while playing)."""
+    if PLAYBACK_STATE["playing"]:
+        return 0.0
+    return time.perf_counter() - PLAYBACK_STATE["ended_at"]
+
+
+def synthesize(text):
+    """Synthesize text to complete WAV bytes (used for cache pre-warming)."""
+    response = groq_client.audio.speech.create(
+        model=TTS_MODEL,
+        voice=TTS_VOICE,
+        input=text,
+        response_format="wav"
+    )
+    return response.read()
+
+
+def prewarm_static_phrases():
+    """Synthesize the fixed prompts registered in tts_cache in the background."""
+    return tts_cache.prewarm(synthesize, TTS_VOICE, TTS_MODEL)
+
+
+def synthesize_cached(text):
+    """Return WAV bytes for text from the TTS cache, synthesizing (and caching) on a miss."""
+    cached = tts_cache.get(text, TTS_VOICE, TTS_MODEL)
+    if cached is not None:
+        return cached
+    audio_bytes = synthesize(text)
+    tts_cache.put(text, TTS_VOICE, TTS_MODEL, audio_bytes)
+    return audio_bytes
+
+
+def iter_sentences(text_chunks, min_chars=MIN_SENTENCE_CHARS):
+    """Regroup streamed text deltas into complete sentences."""
+    pending = ""
+    for chunk in text_chunks:
+        pending += chunk
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(pending):
+            if boundary.start() - start >= min_chars:
+                sentence = pending[start:boundary.start()].strip()
+                if sentence:
+                    yield sentence
+                start = boundary.end()
+        pending = pending[start:]
+    if pending.strip():
+        yield pending.strip()
+
+
+class SpeechQueue:
+    """
+    Strictly ordered playback of utterances whose synthesis runs ahead.
+
+    put() returns immediately: the text is submitted to the TTS pool at once and a
+    player thread plays finished utterances in the order they were enqueued, so the
+    next one is usually synthesized while the current one is still playing.
+    """
+
+    def __init__(self):
+        self._items = queue.Queue()
+        self._player = None
+        self._lock = threading.Lock()
+        self.time_to_first_audio = None  # ms, first utterance played since the last reset()
+
+    def put(self, text, started_at=None):
+        """Enqueue text without blocking; synthesis starts right away."""
+        future = _synthesis_pool.submit(synthesize_cached, text)
+        self._items.put((text, future, started_at or time.perf_counter()))
+        with self._lock:
+            if self._player is None or not self._player.is_alive():
+                self._player = threading.Thread(target=self._play, name="speech-queue", daemon=True)
+                self._player.start()
+
+    def _play(self):
+        while True:
+            text, future, started_at = self._items.get()
+            try:
+                print(f"   - Speaking: '{text}'")
+                first = play_pcm_chunks(iter_wav_pcm([future.result()]), started_at)
+                if self.time_to_first_audio is None:
+                    self.time_to_first_audio = first
+            except Exception as e:
+                print(f"❌ Error speaking queued utterance: {type(e).__name__} - {e}")
+            finally:
+                self._items.task_done()
+
+    def wait(self):
+        """Block until everything enqueued so far has been played."""
+        self._items.join()
 
-# Initialize pygame mixer for playback
-pygame.mixer.init()
-# --- End Deepgram Initialization ---
+    def reset(self):
+        self.time_to_first_audio = None
+
+
+# Shared queue behind speak_many()/enqueue_speech(); speak() waits for it to drain first
+_speech_queue = SpeechQueue()
+
+
+def enqueue_speech(text):
+    """Queue one utterance for ordered playback and return immediately."""
+    _speech_queue.put(text)
+
+
+def wait_for_speech():
+    """Block until all queued utterances have been spoken."""
+    _speech_queue.wait()
+
+
+def speak_many(texts, wait=True):
+    """
+    Speak several utterances back to back. All of them start synthesizing at once on
+    the TTS pool, so the gap between two utterances is playback time, not TTS latency.
+    """
+    for text in texts:
+        if text and text.strip():
+            _speech_queue.put(text.strip())
+    if wait:
+        _speech_queue.wait()
+
+
+def speak_stream(text_chunks):
+    """
+    Speak streamed LLM output sentence by sentence.
+
+    Each sentence is enqueued on the shared speech queue as soon as it is complete,
+    so it is synthesized while the previous one plays. Returns the full spoken text.
+    """
+    print("🔊 Speaking streamed response...")
+    speech = _speech_queue
+    speech.wait()
+    speech.reset()
+    started_at = time.perf_counter()
+    spoken = []
+
+    try:
+        for sentence in iter_sentences(text_chunks):
+            spoken.append(sentence)
+            speech.put(sentence, started_at)
+    except Exception as e:
+        print(f"❌ Error while streaming response: {e}")
+    speech.wait()
+
+    total = (time.perf_counter() - started_at) * 1000
+    LAST_SPEAK_METRICS["time_to_first_audio_ms"] = speech.time_to_first_audio
+    LAST_SPEAK_METRICS["total_ms"] = total
+    if speech.time_to_first_audio is not None:
+        print(f"⏱ Time to first audio: {speech.time_to_first_audio:.0f} ms (total {total:.0f} ms, streamed)")
+    return " ".join(spoken)
+
+
+def _tee(byte_chunks, sink):
+    """Pass byte chunks through while collecting them in sink."""
+    for chunk in byte_chunks:
+        sink.append(chunk)
+        yield chunk
 
 
 def speak(text):
-    """Speak the given text using Groq PlayAI-TTS (MP3 handled properly)."""
+    """Speak the given text using Groq PlayAI-TTS, playing audio while it is still downloading."""
     print(f"🔊 Attempting to speak via Groq PlayAI-TTS: '{text}'")
-    temp_mp3 = None
-    temp_wav = None
+    wait_for_speech()  # Keep order with anything still queued by speak_many()/enqueue_speech()
+    started_at = time.perf_counter()
+    time_to_first_audio = None
+    source = "cache"
 
     try:
-        # Generate speech
-        response = client.audio.speech.create(
-            model="playai-tts",
-            voice="Fritz-PlayAI",
-            input=text,
-            response_format="mp3"
-        )
-        print("✅ Groq TTS API call successful.")
-
-        # Save MP3 audio temporarily
-        temp_mp3 = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        response.write_to_file(temp_mp3.name)
-        temp_mp3.flush() # Ensure data is written before conversion
-        mp3_path = temp_mp3.name
-        temp_mp3.close() # Close the file handle before conversion/playback
-        print(f"   - MP3 saved to: {mp3_path}")
-
-        # Convert MP3 to WAV
-        audio = AudioSegment.from_mp3(mp3_path)
-        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        wav_path = temp_wav.name
-        audio.export(wav_path, format="wav")
-        temp_wav.close() # Close the file handle before playback
-        print(f"   - WAV converted and saved to: {wav_path}")
-
-        # Play WAV audio using playsound (blocking)
-        print(f"   - Playing audio using playsound: {wav_path}...")
-        playsound(wav_path, block=True) # block=True waits for sound to finish
-        print("   - Audio playback finished (playsound).")
-
+        cached = tts_cache.get(text, TTS_VOICE, TTS_MODEL)
+        if cached is not None:
+            time_to_first_audio = play_pcm_chunks(iter_wav_pcm([cached]), started_at)
+        else:
+            source = "network"
+            received = []
+            with groq_client.audio.speech.with_streaming_response.create(
+                model=TTS_MODEL,
+                voice=TTS_VOICE,
+                input=text,
+                response_format="wav"
+            ) as response:
+                pcm_chunks = iter_wav_pcm(_tee(response.iter_bytes(TTS_CHUNK_BYTES), received))
+                time_to_first_audio = play_pcm_chunks(pcm_chunks, started_at)
+            tts_cache.put(text, TTS_VOICE, TTS_MODEL, b''.join(received))
     except Exception as e:
-        # Enhanced error logging
         print(f"❌ Error in speak function: {type(e).__name__} - {e}")
-        print("Traceback:")
         print(traceback.format_exc())
-    finally:
-        # Clean up temp files after playback attempt (or failure)
-        print("   - Cleaning up temporary audio files...")
-        if temp_mp3 and os.path.exists(mp3_path):
-            try:
-                os.remove(mp3_path)
-                print(f"   - Temp file {mp3_path} deleted.")
-            except Exception as e:
-                print(f"⚠️ Error deleting MP3 {mp3_path}: {e}")
-        else:
-            if temp_mp3:
-                print(f"   - Temp MP3 file {mp3_path} not found.")
-
-        if temp_wav and os.path.exists(wav_path):
-            try:
-                os.remove(wav_path)
-                print(f"   - Temp file {wav_path} deleted.")
-            except Exception as e:
-                print(f"⚠️ Error deleting WAV {wav_path}: {e}")
-        else:
-            if temp_wav:
-                 print(f"   - Temp WAV file {wav_path} not found.")
 
-    print("--- Exiting speak function ---") # DEBUG
+    total = (time.perf_counter() - started_at) * 1000
+    LAST_SPEAK_METRICS["time_to_first_audio_ms"] = time_to_first_audio
+    LAST_SPEAK_METRICS["total_ms"] = total
+    if time_to_first_audio is not None:
+        print(f"⏱ Time to first audio: {time_to_first_audio:.0f} ms (total {total:.0f} ms, {source})")
 
 # --- MP3 Playback Function ---
 def play_mp3(file_path):
     """
     Plays an MP3 file using pygame.
     """
+    import pygame # Imported lazily; only needed for MP3 playback
     try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
         print("🔊 Playing MP3...")
@@ -125,72 +396,92 @@ def play_mp3(file_path):
 # --- End MP3 Playback Function ---
 
 
+def get_capture_service(device=None, samplerate=16000, chunk=320):
+    """
+    Return the long-lived capture service, starting it on first use.
+    Pass a device (e.g. capture.WavReplayDevice) before the first listen() to replace the mic.
+    """
+    global _capture_service
+    if _capture_service is None:
+        device = device or capture.PyAudioDevice(get_pyaudio(), samplerate, chunk)
+        _capture_service = capture.CaptureService(device, samplerate, chunk).start()
+    return _capture_service
+
+
+def iter_mic_frames(samplerate=16000, channels=1, chunk=320, preroll_seconds=None):
+    """Yield 16-bit PCM frames from the persistent capture service, including the pre-roll window."""
+    preroll = CAPTURE_PREROLL_SECONDS if preroll_seconds is None else preroll_seconds
+    return get_capture_service(samplerate=samplerate, chunk=chunk).frames(preroll_seconds=preroll)
+
+
+def iter_wav_frames(file_path, chunk=320):
+    """Yield PCM frames from a 16-bit mono WAV file, like iter_mic_frames does for the mic."""
+    with wave.open(file_path, 'rb') as wf:
+        while True:
+            data = wf.readframes(chunk)
+            if len(data) < chunk * wf.getsampwidth():
+                break
+            yield data
+    # Trailing silence so the end-of-speech logic can fire on fixtures
+    while True:
+        yield b'\x00\x00' * chunk
+
+
+def frames_to_wav_bytes(frames, samplerate=16000, channels=1):
+    """Pack PCM frames into an in-memory WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)  # paInt16
+        wf.setframerate(samplerate)
+        wf.writeframes(b''.join(frames))
+    return buffer.getvalue()
+
+
 def record_audio(samplerate=16000, channels=1, chunk=320, silence_duration=3):
     """Record audio from mic until silence is detected."""
     print("🎤 Listening... Speak now!")
 
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16,
-                    channels=channels,
-                    rate=samplerate,
-                    input=True,
-                    frames_per_buffer=chunk)
-
     vad = webrtcvad.Vad(0)
     frames = []
     silence_count = 0
     silence_limit = int(silence_duration * samplerate / chunk)
 
-    while True:
-        data = stream.read(chunk, exception_on_overflow=False)
-        frames.append(data)
-        pcm = np.frombuffer(data, dtype=np.int16)
-        if vad.is_speech(pcm.tobytes(), samplerate):
+    mic = iter_mic_frames(samplerate, channels, chunk)
+    for data in mic:
+        frames.append(bytes(data))  # Copy: the recording may outlast the capture ring
+        if vad.is_speech(data, samplerate):
             silence_count = 0
         else:
             silence_count += 1
         if silence_count > silence_limit:
             print("⏹ Silence detected. Stopping.")
             break
-
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    mic.close()
 
     if len(frames) == 0:
         print("🚫 No valid audio captured.")
         return None
 
     temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    with wave.open(temp_wav.name, 'wb') as wf:
-        wf.setnchannels(channels)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(samplerate)
-        wf.writeframes(b''.join(frames))
+    temp_wav.write(frames_to_wav_bytes(frames, samplerate, channels))
+    temp_wav.close()
 
     print(f"✅ Audio recorded at: {temp_wav.name}")
     return temp_wav.name
 
 
-def transcribe_audio(file_path):
-    """Send audio to Groq Whisper Large v3 Turbo via SDK and get transcription."""
-    # Use the globally initialized Groq client
-    if not groq_client:
+def transcribe_bytes(wav_bytes, name="speech.wav"):
+    """Send in-memory WAV bytes to Whisper and return the transcription text."""
+    if not transcription_client:
         print("🚨 Groq client not initialized. Cannot transcribe.")
         return ""
-
-    if not os.path.exists(file_path):
-        print(f"❌ Audio file not found: {file_path}")
-        return ""
     try:
-        print("🧠 Transcribing via Groq Whisper Large v3 Turbo (SDK)...")
-        with open(file_path, "rb") as audio_file:
-            # Use the global groq_client
-            transcription = groq_client.audio.transcriptions.create(
-                file=(os.path.basename(file_path), audio_file.read()),
-                model="whisper-large-v3-turbo",
-                language="en"
-            )
+        transcription = transcription_client.audio.transcriptions.create(
+            file=(name, wav_bytes),
+            model=WHISPER_MODEL,
+            language="en"
+        )
         # Ensure transcription object and text attribute exist
         return transcription.text if transcription and hasattr(transcription, 'text') else ""
     except Exception as e:
@@ -198,22 +489,94 @@ def transcribe_audio(file_path):
         return ""
 
 
-def listen():
-    """Record audio, transcribe, and return the text."""
-    audio_path = record_audio()
-
-    if audio_path is None:
-        print("🤷 No speech detected, retrying...")
+def transcribe_audio(file_path):
+    """Send audio to Groq Whisper Large v3 Turbo via SDK and get transcription."""
+    if not os.path.exists(file_path):
+        print(f"❌ Audio file not found: {file_path}")
         return ""
+    print("🧠 Transcribing via Groq Whisper Large v3 Turbo (SDK)...")
+    with open(file_path, "rb") as audio_file:
+        return transcribe_bytes(audio_file.read(), name=os.path.basename(file_path))
 
-    text = transcribe_audio(audio_path)
 
-    try:
-        os.remove(audio_path)
-        print(f"🗑 Temp file {audio_path} deleted.")
-    except Exception as e:
-        print(f"⚠️ Could not delete temp file: {e}")
+def capture_segments(frames, samplerate=16000, channels=1, chunk=320, mode="command"):
+    """
+    Capture one utterance from an iterable of PCM frames, shipping segments for transcription as it goes.
+
+    The utterance is split into segments at short pauses; each finished segment is
+    uploaded in the background so that, at end of speech, only the final segment is
+    still in flight. End of speech is decided by an adaptive Endpointer using the
+    profile for `mode` ("command", "dictation" or "therapy").
+
+    Returns:
+        list: Futures of the segment transcriptions in speech order (None if no speech was heard).
+    """
+    print(f"🎤 Listening (streaming, {mode})... Speak now!")
+    endpointer = endpointing.Endpointer(mode, samplerate, chunk)
+    frame_seconds = chunk / samplerate
+    pause_limit = int(SEGMENT_PAUSE_SECONDS / frame_seconds)
+    min_segment = int(MIN_SEGMENT_SECONDS / frame_seconds)
+    max_segment = int(MAX_SEGMENT_SECONDS / frame_seconds)
+    preroll = int(PREROLL_SECONDS / frame_seconds)
+
+    pending = []       # Futures for shipped segments, in speech order
+    segment = []       # Frames of the segment currently being spoken
+
+    def ship(segment_frames):
+        wav_bytes = frames_to_wav_bytes(segment_frames, samplerate, channels)
+        pending.append(_transcription_pool.submit(transcribe_bytes, wav_bytes, f"segment_{len(pending)}.wav"))
+
+    for data in frames:
+        done = endpointer.process(data)
+        segment.append(data)
+        if done:
+            break
+
+        if not endpointer.heard_speech:
+            # Keep only a short pre-roll before the first speech frame
+            del segment[:-preroll or None]
+        elif (endpointer.silence_frames == pause_limit and len(segment) >= min_segment) or len(segment) >= max_segment:
+            ship(segment)
+            segment = []
+
+    if hasattr(frames, "close"):
+        frames.close()
+
+    LAST_ENDPOINT_METRICS.clear()
+    LAST_ENDPOINT_METRICS.update(endpointer.metrics)
+    if not endpointer.heard_speech:
+        print("🚫 No speech captured.")
+        return None
+    print(f"⏹ End of speech ({endpointer.metrics.get('reason')}): hangover {endpointer.hangover:.2f}s, "
+          f"end-of-speech to stop {endpointer.metrics.get('eos_to_stop_ms')} ms.")
+
+    # Drop the trailing silence tail; ship whatever speech is left
+    speech_tail = segment[:max(0, len(segment) - endpointer.silence_frames)]
+    if speech_tail:
+        ship(speech_tail)
+    return pending
 
+
+def join_segments(texts):
+    """Join segment transcriptions, skipping empty ones."""
+    return " ".join(text.strip() for text in texts if text and text.strip())
+
+
+def stream_transcribe(frames, samplerate=16000, channels=1, chunk=320, mode="command"):
+    """
+    Capture speech from an iterable of PCM frames and transcribe it while it is spoken.
+
+    Returns:
+        str: The joined transcription ("" if no speech was heard).
+    """
+    pending = capture_segments(frames, samplerate, channels, chunk, mode)
+    if pending is None:
+        return ""
+    return join_segments(future.result() for future in pending)
+
+
+def clean_transcript(text):
+    """Stripped transcription, or "" if it is empty or a single word (usually noise)."""
     if not text or text.isspace():
         print("🤷 No speech detected, retrying...")
         return ""
@@ -228,3 +591,29 @@ def listen():
     print(f"🔍 Final Transcription: '{cleaned_text}'")
     return cleaned_text
 
+
+def listen(mode="command"):
+    """
+    Record audio, transcribe, and return the text.
+    `mode` selects the end-of-speech profile: "command", "dictation" or "therapy".
+    """
+    wait_for_speech()  # Don't record queued prompts that are still playing
+    if STREAMING_TRANSCRIPTION:
+        text = stream_transcribe(iter_mic_frames(), mode=mode)
+    else:
+        profile = mode if mode in endpointing.PROFILES else "command"
+        audio_path = record_audio(silence_duration=endpointing.adapted_hangover(profile))
+
+        if audio_path is None:
+            print("🤷 No speech detected, retrying...")
+            return ""
+
+        text = transcribe_audio(audio_path)
+
+        try:
+            os.remove(audio_path)
+            print(f"🗑 Temp file {audio_path} deleted.")
+        except Exception as e:
+            print(f"⚠️ Could not delete temp file: {e}")
+
+    return clean_transcript(text)
@@ -0,0 +1,150 @@
+# capture.py
+
+import time
+import wave
+import threading
+import numpy as np
+
+
+class PyAudioDevice:
+    """Microphone input through one long-lived PyAudio callback stream."""
+
+    def __init__(self, pa, samplerate=16000, frame_samples=320):
+        self.pa = pa
+        self.samplerate = samplerate
+        self.frame_samples = frame_samples
+        self.stream = None
+
+    def start(self, on_audio):
+        import pyaudio  # Only needed for the real device
+
+        def callback(in_data, frame_count, time_info, status):
+            on_audio(in_data)
+            return (None, pyaudio.paContinue)
+
+        self.stream = self.pa.open(format=pyaudio.paInt16,
+                                   channels=1,
+                                   rate=self.samplerate,
+                                   input=True,
+                                   frames_per_buffer=self.frame_samples,
+                                   stream_callback=callback)
+        self.stream.start_stream()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+
+class WavReplayDevice:
+    """
+    Fake input device that replays 16-bit mono WAV files, for testing without a mic.
+    Each file is followed by trailing_seconds of silence so end-of-speech can trigger.
+    """
+
+    def __init__(self, paths, frame_samples=320, realtime=True, trailing_seconds=4.0):
+        self.paths = list(paths)
+        self.frame_samples = frame_samples
+        self.realtime = realtime
+        self.trailing_seconds = trailing_seconds
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, on_audio):
+        self._thread = threading.Thread(target=self._run, args=(on_audio,), name="wav-replay", daemon=True)
+        self._thread.start()
+
+    def _run(self, on_audio):
+        frame_bytes = self.frame_samples * 2
+        for path in self.paths:
+            with wave.open(path, 'rb') as wf:
+                frame_seconds = self.frame_samples / wf.getframerate()
+                data = wf.readframes(wf.getnframes())
+            silence = bytes(frame_bytes) * int(self.trailing_seconds / frame_seconds)
+            data += silence + bytes(-len(data) % frame_bytes)
+            for offset in range(0, len(data), frame_bytes):
+                if self._stopped.is_set():
+                    return
+                on_audio(data[offset:offset + frame_bytes])
+                if self.realtime:
+                    time.sleep(frame_seconds)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class CaptureService:
+    """
+    Owns one input device for the whole session and writes its audio into a
+    preallocated int16 ring buffer. Readers pull fixed-size frames from the ring,
+    optionally starting a little in the past (pre-roll) so that speech which began
+    just before listen() was called is not clipped.
+    """
+
+    def __init__(self, device, samplerate=16000, frame_samples=320, buffer_seconds=30):
+        self.device = device
+        self.samplerate = samplerate
+        self.frame_samples = frame_samples
+        frames = int(buffer_seconds * samplerate / frame_samples)
+        self.ring = np.zeros(frames * frame_samples, dtype=np.int16)
+        self.written = 0  # Total samples written since start (monotonic)
+        self._cond = threading.Condition()
+        self._running = False
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.device.start(self._on_audio)
+        return self
+
+    def stop(self):
+        self._running = False
+        self.device.stop()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _on_audio(self, data):
+        """Device callback: copy the incoming samples straight into the ring."""
+        samples = np.frombuffer(data, dtype=np.int16)  # View over the device buffer
+        size = len(self.ring)
+        with self._cond:
+            start = self.written % size
+            end = start + len(samples)
+            if end <= size:
+                self.ring[start:end] = samples
+            else:
+                split = size - start
+                self.ring[start:] = samples[:split]
+                self.ring[:end - size] = samples[split:]
+            self.written += len(samples)
+            self._cond.notify_all()
+
+    def frames(self, preroll_seconds=0.0, timeout=1.0):
+        """
+        Yield frames (bytes-like views into the ring) starting preroll_seconds in the past.
+        Stops when the service is stopped or no audio arrives for `timeout` seconds.
+
+        The views alias the ring and are overwritten once it wraps (buffer_seconds later).
+        Consumers that keep frames longer than that must copy them (bytes(frame)).
+        """
+        size = len(self.ring)
+        n = self.frame_samples
+        with self._cond:
+            preroll = int(preroll_seconds * self.samplerate) // n * n
+            position = max(0, self.written - preroll, self.written - size + n)
+            position += -position % n  # Round up to a frame boundary
+
+        while True:
+            with self._cond:
+                while self.written - position < n:
+                    if not self._running or not self._cond.wait(timeout):
+                        return
+                if self.written - position > size - n:
+                    # Reader fell behind and the ring wrapped; skip to the oldest valid frame
+                    position = self.written - size + n
+                    position += -position % n
+            # The ring length is a multiple of the frame size, so a frame never wraps
+            start = position % size
+            yield memoryview(self.ring[start:start + n]).cast('B').toreadonly()
+            position += n
@@ -0,0 +1,198 @@
+# endpointing.py
+
+import sys
+import time
+import json
+import wave
+import os
+from collections import deque
+import numpy as np
+import webrtcvad
+
+# Per-mode end-of-speech profiles (seconds).
+#   hangover:          initial silence needed to end the utterance (adapted over time)
+#   min/max_hangover:  bounds for the adapted hangover
+#   no_speech_timeout: give up if nothing is said for this long
+#   max_utterance:     hard cap on utterance length
+PROFILES = {
+    "command":   {"hangover": 0.7, "min_hangover": 0.4, "max_hangover": 1.2, "no_speech_timeout": 6.0, "max_utterance": 15.0},
+    "dictation": {"hangover": 1.2, "min_hangover": 0.8, "max_hangover": 2.0, "no_speech_timeout": 8.0, "max_utterance": 60.0},
+    "therapy":   {"hangover": 1.6, "min_hangover": 1.0, "max_hangover": 3.0, "no_speech_timeout": 10.0, "max_utterance": 90.0},
+}
+
+VAD_AGGRESSIVENESS = 1
+SNR_MARGIN_DB = 6.0        # A frame must be this far above the noise floor to count as speech
+NOISE_FLOOR_ALPHA = 0.05   # EMA rate for the noise floor on non-speech frames
+MIN_PAUSE_SECONDS = 0.15   # Shorter gaps are treated as part of a word, not a pause
+PAUSE_PERCENTILE = 90      # Hangover covers this percentile of the user's observed pauses
+PAUSE_MARGIN_SECONDS = 0.15
+PAUSE_HISTORY = 50         # Pauses remembered per mode
+
+# Pauses observed inside utterances, per profile; shared by all Endpointers in the session
+_learned_pauses = {name: deque(maxlen=PAUSE_HISTORY) for name in PROFILES}
+
+
+def frame_energies_db(samples, frame_samples=320):
+    """Vectorized per-frame energy in dBFS for an int16 sample array."""
+    usable = len(samples) - len(samples) % frame_samples
+    frames = samples[:usable].reshape(-1, frame_samples).astype(np.float32) / 32768.0
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def frame_energy_db(frame):
+    """Energy in dBFS of a single frame (bytes-like int16 PCM)."""
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+    return 10.0 * np.log10(np.mean(samples * samples) + 1e-10)
+
+
+def adapted_hangover(profile):
+    """Hangover for a profile, learned from the user's pauses and clamped to the profile bounds."""
+    settings = PROFILES[profile]
+    pauses = _learned_pauses[profile]
+    if len(pauses) < 5:
+        return settings["hangover"]
+    learned = float(np.percentile(np.fromiter(pauses, dtype=np.float32), PAUSE_PERCENTILE)) + PAUSE_MARGIN_SECONDS
+    return min(settings["max_hangover"], max(settings["min_hangover"], learned))
+
+
+class Endpointer:
+    """
+    Decides when an utterance has ended, one frame at a time.
+
+    A frame counts as speech only if WebRTC VAD says so AND its energy is above an
+    adaptive noise floor. The utterance ends after `hangover` seconds of non-speech;
+    the hangover adapts to the pauses the user makes inside sentences.
+    """
+
+    def __init__(self, profile="command", samplerate=16000, frame_samples=320, vad=None):
+        if profile not in PROFILES:
+            print(f"WARN: Unknown endpointing profile '{profile}', using 'command'.")
+            profile = "command"
+        self.profile = profile
+        self.samplerate = samplerate
+        self.frame_seconds = frame_samples / samplerate
+        self.vad = vad or webrtcvad.Vad(VAD_AGGRESSIVENESS)
+        settings = PROFILES[profile]
+        self.hangover = adapted_hangover(profile)
+        self.hangover_frames = int(self.hangover / self.frame_seconds)
+        self.timeout_frames = int(settings["no_speech_timeout"] / self.frame_seconds)
+        self.max_frames = int(settings["max_utterance"] / self.frame_seconds)
+
+        self.noise_floor_db = None
+        self.frame_index = 0
+        self.heard_speech = False
+        self.last_is_speech = False
+        self.silence_frames = 0
+        self.last_speech_frame = None
+        self.last_speech_time = None
+        self.pauses = []
+        self.metrics = {}
+
+    def process(self, frame):
+        """Feed one frame. Returns True once the utterance has ended."""
+        energy = frame_energy_db(frame)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = energy
+        is_speech = self.vad.is_speech(frame, self.samplerate) and energy > self.noise_floor_db + SNR_MARGIN_DB
+
+        if is_speech:
+            if self.heard_speech and self.silence_frames * self.frame_seconds >= MIN_PAUSE_SECONDS:
+                self.pauses.append(self.silence_frames * self.frame_seconds)
+            self.heard_speech = True
+            self.silence_frames = 0
+            self.last_speech_frame = self.frame_index
+            self.last_speech_time = time.perf_counter()
+        else:
+            self.silence_frames += 1
+            # Track the noise floor: drop quickly to quieter frames, rise slowly
+            if energy < self.noise_floor_db:
+                self.noise_floor_db = energy
+            else:
+                self.noise_floor_db += NOISE_FLOOR_ALPHA * (energy - self.noise_floor_db)
+
+        self.last_is_speech = is_speech
+        self.frame_index += 1
+
+        if self.heard_speech and self.silence_frames >= self.hangover_frames:
+            return self._finish("silence")
+        if not self.heard_speech and self.frame_index >= self.timeout_frames:
+            return self._finish("no_speech")
+        if self.frame_index >= self.max_frames:
+            return self._finish("max_length")
+        return False
+
+    def _finish(self, reason):
+        """Record metrics and learn from this utterance's pauses."""
+        _learned_pauses[self.profile].extend(self.pauses)
+        self.metrics = {
+            "reason": reason,
+            "profile": self.profile,
+            "hangover_s": round(self.hangover, 3),
+            "speech_end_s": None if self.last_speech_frame is None else round((self.last_speech_frame + 1) * self.frame_seconds, 3),
+            "stop_s": round(self.frame_index * self.frame_seconds, 3),
+            "eos_to_stop_ms": None,
+        }
+        if self.last_speech_time is not None:
+            self.metrics["eos_to_stop_ms"] = round((time.perf_counter() - self.last_speech_time) * 1000, 1)
+        return True
+
+
+def evaluate_file(path, profile="command", frame_samples=320):
+    """
+    Run the endpointer over a 16 kHz mono 16-bit WAV (followed by synthetic silence) and
+    return its metrics. If a sidecar '<file>.json' with {"speech_end": seconds}
+    exists, report how early (clipped) or late the stop was relative to it.
+    Raises ValueError for any other WAV format, since the mic captures 16 kHz mono int16.
+    """
+    with wave.open(path, 'rb') as wf:
+        samplerate = wf.getframerate()
+        if (samplerate, wf.getnchannels(), wf.getsampwidth()) != (16000, 1, 2):
+            raise ValueError(f"{os.path.basename(path)}: expected 16 kHz mono 16-bit PCM, got "
+                             f"{samplerate} Hz, {wf.getnchannels()} channel(s), {wf.getsampwidth() * 8}-bit")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    tail = np.zeros(int(PROFILES[profile]["max_hangover"] * samplerate) + frame_samples, dtype=np.int16)
+    samples = np.concatenate((samples, tail))
+
+    endpointer = Endpointer(profile, samplerate, frame_samples)
+    frame_bytes = frame_samples * 2
+    data = samples.tobytes()
+    for offset in range(0, len(data) - frame_bytes + 1, frame_bytes):
+        if endpointer.process(data[offset:offset + frame_bytes]):
+            break
+
+    metrics = dict(endpointer.metrics)
+    metrics["file"] = os.path.basename(path)
+    energies = frame_energies_db(samples, frame_samples)
+    metrics["noise_floor_db"] = round(float(np.percentile(energies, 10)), 1)
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            truth = json.load(f).get("speech_end")
+        if truth is not None and metrics["stop_s"] is not None:
+            metrics["stop_after_truth_ms"] = round((metrics["stop_s"] - truth) * 1000, 1)
+    return metrics
+
+
+if __name__ == "__main__":
+    # Usage: python endpointing.py [--profile command|dictation|therapy] file1.wav file2.wav ...
+    args = sys.argv[1:]
+    profile = "command"
+    if args[:1] == ["--profile"]:
+        profile, args = args[1], args[2:]
+    if not args:
+        print("Usage: python endpointing.py [--profile command|dictation|therapy] file.wav ...")
+        sys.exit(1)
+    for wav_path in args:
+        try:
+            result = evaluate_file(wav_path, profile)
+        except ValueError as e:
+            print(f"❌ Skipped {e}")
+            continue
+        tail_ms = None
+        if result["speech_end_s"] is not None:
+            tail_ms = round((result["stop_s"] - result["speech_end_s"]) * 1000)
+        line = (f"{result['file']}: stop={result['stop_s']}s speech_end={result['speech_end_s']}s "
+                f"tail={tail_ms}ms (old fixed tail: 3000ms) reason={result['reason']}")
+        if "stop_after_truth_ms" in result:
+            line += f" vs_annotation={result['stop_after_truth_ms']}ms"
+        print(line)
@@ -1,31 +1,95 @@
 import re
+import math
+import time
 import string
-from groq import Groq
-import os
+from collections import namedtuple, OrderedDict
+import transport
+import llm
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Initialize the Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Shared Groq client on the process-wide connection pool
+client = transport.get_groq_client()
 
-def is_exit_command(user_input):
-    """
-    Uses a Groq model to classify if the user input indicates an intent to exit *this specific application*.
+# Keywords that clearly mean "stop the assistant" (deliberately excludes "close")
+EXIT_KEYWORDS = ["exit", "quit", "goodbye", "bye bye", "turn off", "shut down"]
 
-    Parameters:
-      - user_input: The user's transcribed text.
 
-    Returns:
-      True if the intent is classified as "exit", False otherwise.
-    """
-    clean_input = user_input.lower().translate(str.maketrans('', '', string.punctuation)).strip()
+def normalize_input(user_input):
+    """Lowercase the input and strip punctuation and surrounding whitespace."""
+    return " ".join(user_input.lower().translate(str.maketrans('', '', string.punctuation)).split())
 
-    if not clean_input:
-        return False
 
-    # Improved prompt to differentiate exiting this app vs closing others
+def keyword_exit_match(clean_input):
+    """Return True if the normalized input contains one of the EXIT_KEYWORDS as whole words."""
+    return any(re.search(rf"\b{re.escape(keyword)}\b", clean_input) for keyword in EXIT_KEYWORDS)
+
+
+# Whole utterances (after normalization and dropping fillers) that always mean quit the assistant
+QUIT_PHRASES = {
+    "stop", "exit", "quit", "bye", "goodbye", "bye bye", "good bye", "exit now", "quit now", "stop now",
+    "shut down", "turn off", "see you", "see you later", "bye for now", "end session", "end conversation",
+}
+# Whole utterances that mean leave the current mode; from the main loop they may just mean
+# cancel or be quiet, so there they are left to the LLM
+MODE_EXIT_PHRASES = {
+    "thats all", "that is all", "thats it", "im done", "i am done", "were done", "we are done", "done",
+    "enough", "thats enough", "stop listening", "stop talking", "go away", "end", "leave",
+    "cancel", "never mind", "nevermind", "nothing else", "no thats all", "no thanks thats all",
+}
+FILLER_WORDS = {"aero", "hey", "ok", "okay", "please", "now", "just", "so", "well", "alright", "thanks", "thank", "you"}
+
+# Small linear scoring model over word features; positive weights push towards exit
+EXIT_WEIGHTS = {
+    "exit": 3.0, "quit": 3.0, "goodbye": 3.0, "bye": 2.5, "stop": 2.0, "terminate": 2.5,
+    "done": 1.5, "enough": 1.5, "finish": 1.5, "finished": 1.5, "end": 1.2, "leave": 1.2,
+    "shut": 1.2, "down": 0.3, "off": 0.5, "cancel": 1.0,
+    "aero": 1.0, "assistant": 1.0, "mode": 1.0, "session": 1.0, "conversation": 1.0,
+    "listening": 1.0, "talking": 0.8, "program": 0.8, "application": 0.5, "yourself": 1.0,
+    # Words that usually mean the user is carrying on, or closing something else
+    "close": -2.0, "browser": -1.5, "window": -1.5, "windows": -1.5, "tab": -1.5, "apps": -1.5,
+    "chrome": -1.5, "music": -1.5, "song": -1.5, "timer": -1.5, "alarm": -1.5, "volume": -1.5,
+    "dont": -3.0, "not": -2.0, "never": -1.0, "continue": -3.0, "keep": -2.0, "more": -1.5,
+    "what": -1.5, "how": -1.5, "why": -1.5, "who": -1.5, "when": -1.0, "tell": -1.5,
+    "about": -1.0, "news": -0.5, "message": -1.0, "send": -1.5, "write": -1.5,
+}
+EXIT_BIAS = -2.0
+LENGTH_PENALTY = 0.35           # Per word beyond LENGTH_FREE_WORDS; long sentences are rarely plain exits
+LENGTH_FREE_WORDS = 4
+EXIT_THRESHOLD = 0.85           # Score at or above this exits without asking the LLM
+CONTINUE_THRESHOLD = 0.15       # Score at or below this continues without asking the LLM
+
+MEMO_SIZE = 512                 # Normalized utterances remembered with their decision
+
+ExitDecision = namedtuple("ExitDecision", ["is_exit", "score", "source", "latency_ms"])
+
+# Decisions per source this session ("phrase", "score", "llm", "fallback", "undecided", "memo")
+STATS = {"phrase": 0, "score": 0, "llm": 0, "fallback": 0, "memo": 0}
+_memo = OrderedDict()  # (normalized text, top_level) -> (is_exit, score, source), most recently used last
+
+
+def strip_fillers(clean_input):
+    """Drop leading/trailing filler words such as "okay", "please" or the wake word."""
+    words = clean_input.split()
+    while words and words[0] in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1] in FILLER_WORDS:
+        words.pop()
+    return " ".join(words)
+
+
+def exit_score(clean_input):
+    """Probability-like exit score in [0, 1] from the word-feature model."""
+    words = clean_input.split()
+    logit = EXIT_BIAS + sum(EXIT_WEIGHTS.get(word, 0.0) for word in set(words))
+    logit -= LENGTH_PENALTY * max(0, len(words) - LENGTH_FREE_WORDS)
+    return 1.0 / (1.0 + math.exp(-logit))
+
+
+def classify_exit_with_llm(clean_input):
+    """Ask a small Groq model; returns True/False, or None if the call failed."""
     prompt = f"""
 Analyze the user's statement and determine if their primary intent is specifically to stop or exit **the current assistant application (AERO)**.
 Distinguish this from requests to close *other* applications or windows.
@@ -47,34 +111,94 @@ User statement: "{clean_input}"
 Intent (exit/continue):
 """
     try:
-        response = client.chat.completions.create(
+        intent = llm.complete_text(
+            client,
+            site="exit",
             model="llama3-8b-8192",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.0,
             max_tokens=10
-        )
-        intent = response.choices[0].message.content.strip().lower()
+        ).strip().lower()
         # Basic validation in case the model returns something unexpected
         if intent not in ["exit", "continue"]:
-             print(f"WARN (is_exit_command): Unexpected LLM response '{intent}'. Defaulting to 'continue'.")
-             intent = "continue"
-
-        print(f"DEBUG (is_exit_command): Input='{clean_input}', Classified Intent='{intent}'")
+            print(f"WARN (is_exit_command): Unexpected LLM response '{intent}'. Defaulting to 'continue'.")
+            intent = "continue"
         return intent == "exit"
-
     except Exception as e:
         print(f"❌ Error during exit intent classification: {e}")
-        # Fallback: More robust keyword check as backup
-        exit_keywords = ["exit", "quit", "goodbye", "bye bye", "turn off", "shut down"]
-        # Check for specific exit keywords, avoiding "close"
-        if any(re.search(rf"\b{re.escape(keyword)}\b", clean_input) for keyword in exit_keywords):
-             print("DEBUG (is_exit_command): Fallback keyword match found -> exit")
-             return True
-        print("DEBUG (is_exit_command): Fallback -> continue")
-        return False
+        return None
+
+
+def decide_locally(clean_input, top_level=False):
+    """(is_exit, score, source) when the local rules are sure, else (None, score, None)."""
+    core = strip_fillers(clean_input)
+    if core in QUIT_PHRASES or (core in MODE_EXIT_PHRASES and not top_level):
+        return True, 1.0, "phrase"
+    score = exit_score(core)
+    if core in MODE_EXIT_PHRASES:
+        return None, score, None
+    if score >= EXIT_THRESHOLD:
+        return True, score, "score"
+    if score <= CONTINUE_THRESHOLD:
+        return False, score, "score"
+    return None, score, None
+
+
+def detect_exit(user_input, escalate=True, top_level=False):
+    """
+    Decide whether the user wants to leave the assistant or the current mode.
+
+    Clear cases are decided locally (phrase match, then the scoring model); only
+    ambiguous inputs go to the LLM, and only if `escalate` is set (otherwise the
+    source is "undecided" and is_exit is False). With `top_level` set (the main
+    loop, where an exit quits the whole assistant) only QUIT_PHRASES match locally.
+    Results are memoized per normalized text and level.
+
+    Returns:
+        ExitDecision(is_exit, score, source, latency_ms)
+    """
+    started_at = time.perf_counter()
+    clean_input = normalize_input(user_input)
+    if not clean_input:
+        return ExitDecision(False, 0.0, "empty", 0.0)
+
+    memo_key = (clean_input, top_level)
+    memoized = _memo.get(memo_key)
+    if memoized is not None:
+        _memo.move_to_end(memo_key)
+        STATS["memo"] += 1
+        is_exit, score, source = memoized
+    else:
+        is_exit, score, source = decide_locally(clean_input, top_level)
+        if is_exit is None and escalate:
+            is_exit, source = classify_exit_with_llm(clean_input), "llm"
+            if is_exit is None:
+                # Fallback: keyword check as backup (avoids "close")
+                is_exit, source = keyword_exit_match(clean_input), "fallback"
+        elif is_exit is None:
+            is_exit, source = False, "undecided"
+        STATS[source] = STATS.get(source, 0) + 1
+        if source in ("phrase", "score", "llm"):  # Fallbacks and undecided inputs are retried next time
+            _memo[memo_key] = (is_exit, score, source)
+            if len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+
+    decision = ExitDecision(is_exit, round(score, 3), source, round((time.perf_counter() - started_at) * 1000, 2))
+    print(f"DEBUG (exit): '{clean_input}' -> exit={decision.is_exit} score={decision.score} "
+          f"source={decision.source} latency={decision.latency_ms} ms")
+    return decision
+
+
+def is_exit_command(user_input):
+    """
+    Return True if the user wants to exit the assistant (or the current mode).
+    Local-first: see detect_exit().
+    """
+    return detect_exit(user_input).is_exit
 
 # Example usage (optional, for testing this file directly)
 if __name__ == '__main__':
-    test_phrases = ["stop", "exit now", "please continue", "tell me a joke", "goodbye", "quit the application"]
+    test_phrases = ["stop", "exit now", "please continue", "tell me a joke", "goodbye", "quit the application",
+                    "close all apps", "okay that's all thanks", "stop the music", "I think we're done here"]
     for phrase in test_phrases:
-        print(f"'{phrase}' -> Is exit? {is_exit_command(phrase)}")
\ No newline at end of file
+        print(f"'{phrase}' -> {detect_exit(phrase, escalate=False)}")
@@ -1,13 +1,16 @@
 import os
 import re
 import webbrowser
+import threading
 from datetime import datetime, timedelta
-from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError, TransportError
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
 import audio  # Assuming your audio.py is available
+import transport
 
 # Google Calendar API Scope
 SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
@@ -48,26 +51,60 @@ def preprocess_text(natural_text):
 
     return natural_text
 
+# Process-wide cached Calendar service; its credentials live in memory and are
+# refreshed by google-auth when they expire (token.json is only written after consent)
+TOKEN_PATH = "token.json"
+_service = None
+_service_lock = threading.Lock()
+
 def authenticate_google_calendar():
     creds = None
-    token_path = "token.json"
 
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-        if not creds or not creds.valid or not creds.refresh_token:
-            os.remove(token_path)
+    if os.path.exists(TOKEN_PATH):
+        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        # An expired token is fine as long as it can be refreshed; only drop unusable ones
+        if not creds or not creds.refresh_token:
+            os.remove(TOKEN_PATH)
             creds = None
 
     if not creds:
         flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
         creds = flow.run_local_server(port=0, access_type="offline", prompt="consent")
-        with open(token_path, "w") as token:
+        with open(TOKEN_PATH, "w") as token:
             token.write(creds.to_json())
 
     if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
+        creds.refresh(transport.get_google_request())
+
+    return creds
 
-    return build("calendar", "v3", credentials=creds)
+def get_calendar_service():
+    """
+    Return the cached Calendar service, building it on first use from the discovery
+    document bundled with google-api-python-client (no discovery fetch over the network).
+    Its requests go through transport.get_google_http(), so they time out like every other call.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            creds = authenticate_google_calendar()
+            _service = build("calendar", "v3", http=transport.get_google_http(creds),
+                             static_discovery=True, cache_discovery=False)
+        return _service
+
+def reset_calendar_service(drop_token=False):
+    """
+    Forget the cached service so the next call rebuilds it. With drop_token the stored
+    credentials are deleted too (revoked/expired refresh token), forcing a new consent.
+    """
+    global _service
+    with _service_lock:
+        _service = None
+        if drop_token and os.path.exists(TOKEN_PATH):
+            try:
+                os.remove(TOKEN_PATH)
+            except OSError as e:
+                print(f"WARN: Could not delete {TOKEN_PATH}: {e}")
 
 def extract_event_details(natural_text):
     """
@@ -152,7 +189,7 @@ def extract_event_details(natural_text):
 
 def create_calendar_event(event_details):
     try:
-        service = authenticate_google_calendar()
+        service = get_calendar_service()
         event = {
             "summary": event_details["title"],
             "description": f"Created via AI Assistant: {event_details['title']}",
@@ -178,6 +215,19 @@ def create_calendar_event(event_details):
     except HttpError as error:
         print(f"❌ An error occurred: {error}")
         audio.speak("An error occurred while creating the event. Please try again.")
+    except RefreshError as error:
+        # The refresh token was revoked or expired; sign in again on the next request
+        print(f"❌ Google credentials could not be refreshed: {error}")
+        reset_calendar_service(drop_token=True)
+        audio.speak("Your Google sign-in has expired. Please try again and sign in when the browser opens.")
+    except FileNotFoundError as error:
+        # credentials.json (the OAuth client from Google Cloud Console) is missing
+        print(f"❌ Google Calendar is not set up: {error}")
+        audio.speak("Google Calendar isn't set up yet. Please add the credentials file from Google Cloud and try again.")
+    except (TransportError, HttpLib2Error, OSError) as error:
+        print(f"❌ Could not reach Google Calendar: {error}")
+        reset_calendar_service()
+        audio.speak("I couldn't reach Google Calendar. Please check your connection and try again.")
 
 def create_calendar_event_from_input(event_input):
     audio.speak("Processing your request.")
@@ -194,7 +244,7 @@ def prompt_and_create_calendar_event():
     """
     try:
         audio.speak("Sure, what event would you like to add?")
-        user_input = audio.listen().strip()
+        user_input = audio.listen(mode="dictation").strip()
         if user_input:
             create_calendar_event_from_input(user_input)
         else:
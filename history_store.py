@@ -0,0 +1,144 @@
+# history_store.py
+
+import os
+import json
+import time
+import atexit
+from collections import deque
+
+
+class HistoryStore:
+    """
+    Append-only JSONL conversation log with a bounded in-memory window.
+
+    Each message is written as one JSON line, so saving a turn costs O(1) bytes
+    instead of re-serializing the whole history. fsync is batched, the file is
+    compacted to its most recent messages once it grows past a threshold, and
+    startup only reads the tail needed to fill the window.
+    """
+
+    def __init__(self, filepath, window_size, legacy_path=None,
+                 fsync_every=8, fsync_interval=5.0,
+                 compact_threshold=5000, compact_keep=1000):
+        self.filepath = filepath
+        self.legacy_path = legacy_path
+        self.window = deque(maxlen=window_size)
+        self.fsync_every = fsync_every            # fsync after this many unsynced appends...
+        self.fsync_interval = fsync_interval      # ...or once this many seconds have passed
+        self.compact_threshold = compact_threshold
+        self.compact_keep = compact_keep
+        self._file = None
+        self._line_count = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        atexit.register(self.close)
+
+    # --- Loading ---
+    def load(self):
+        """Fill the in-memory window from the tail of the log (migrating the legacy JSON file once)."""
+        if not os.path.exists(self.filepath) and self.legacy_path and os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+
+        self.window.clear()
+        if os.path.exists(self.filepath):
+            for line in self._read_tail_lines(self.window.maxlen):
+                try:
+                    self.window.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash; skip it
+                    print(f"WARN: Skipping unreadable history line in {self.filepath}.")
+            self._line_count = self._count_lines()
+        return self.window
+
+    def _read_tail_lines(self, n, block_size=8192):
+        """Return the last n non-empty lines of the log without reading the whole file."""
+        with open(self.filepath, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            while position > 0 and data.count(b'\n') <= n:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                data = f.read(read_size) + data
+        lines = [line for line in data.split(b'\n') if line.strip()]
+        return [line.decode('utf-8') for line in lines[-n:]] if n else []
+
+    def _count_lines(self):
+        with open(self.filepath, 'rb') as f:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 16), b''))
+
+    def _migrate_legacy(self):
+        """Convert the old indented conversation_history.json into the JSONL log."""
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                messages = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"WARN: Could not migrate history file {self.legacy_path}: {e}. Starting fresh.")
+            return
+        self._write_atomic(messages[-self.compact_keep:])
+        print(f"INFO: Migrated {len(messages)} messages from {self.legacy_path} to {self.filepath}.")
+
+    # --- Writing ---
+    def append(self, message):
+        """Add a message to the window and append it to the log."""
+        self.window.append(message)
+        try:
+            if self._file is None:
+                self._file = open(self.filepath, 'a', encoding='utf-8')
+            self._file.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._line_count += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+            if self._line_count > self.compact_threshold:
+                self.compact()
+        except IOError as e:
+            print(f"ERROR: Could not append to history file {self.filepath}: {e}")
+
+    def sync(self):
+        """Force appended messages to disk."""
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Rewrite the log keeping only the most recent compact_keep messages."""
+        self.close()
+        messages = []
+        for line in self._read_tail_lines(self.compact_keep):
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        self._write_atomic(messages)
+        print(f"INFO: Compacted history to {len(messages)} messages.")
+
+    def _write_atomic(self, messages):
+        temp_path = self.filepath + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.filepath)
+        self._line_count = len(messages)
+
+    def close(self):
+        """Flush, fsync and close the log file."""
+        if self._file is not None:
+            try:
+                self._file.flush()
+                self.sync()
+                self._file.close()
+            except (IOError, ValueError) as e:
+                print(f"WARN: Could not close history file {self.filepath}: {e}")
+            self._file = None
+
+    def __iter__(self):
+        return iter(self.window)
+
+    def __len__(self):
+        return len(self.window)
@@ -0,0 +1,401 @@
+# intent_knn.py
+
+import os
+import sys
+import json
+import time
+import zlib
+import threading
+from collections import namedtuple, defaultdict
+import numpy as np
+
+import intent_rules
+
+# Result of the nearest-neighbour classifier.
+#   category:   winning category, or None if the bank is empty
+#   confidence: share of the neighbours' similarity mass that voted for the category
+#   similarity: cosine similarity of the closest neighbour with that category
+KnnMatch = namedtuple("KnnMatch", ["category", "confidence", "similarity"])
+
+# --- Classifier Settings ---
+EMBED_MODEL = os.getenv("INTENT_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+USE_TRANSFORMER = os.getenv("INTENT_EMBEDDINGS", "auto") != "hashed"  # "hashed" forces the NumPy fallback
+HASH_DIM = 4096          # Width of the hashed n-gram fallback embedding
+K = 5                    # Neighbours that vote
+# Closest exemplar must be at least this close (per embedding backend)...
+# "hashed" is the lowest value reaching 95% accuracy on intent_calibration.jsonl (python intent_knn.py --calibrate);
+# on the held-out intent_eval.jsonl it answers 21% (12 of 56), all correctly (python intent_knn.py --eval);
+# "transformer" is an uncalibrated guess: run --calibrate with sentence-transformers installed before relying on it
+MIN_SIMILARITY = {"transformer": 0.55, "hashed": 0.40}
+MIN_VOTE_SHARE = 0.7     # ...and this share of the vote must agree, else the LLM decides
+# Skills whose side effects are hard to undo are never routed on a similarity vote alone
+NO_KNN_CATEGORIES = {"close_active_apps"}
+MAX_LEARNED_EXAMPLES = 500  # LLM decisions kept in the bank per session (oldest dropped first)
+CALIBRATION_FILE = os.path.join(os.path.dirname(__file__), "intent_calibration.jsonl")  # Labeled utterances for tuning
+EVAL_FILE = os.path.join(os.path.dirname(__file__), "intent_eval.jsonl")  # Held-out labeled utterances, never tuned on
+HISTORY_FILES = [
+    os.path.join(os.path.dirname(__file__), "conversation_history.jsonl"),
+    os.path.join(os.path.dirname(__file__), "conversation_history.json"),
+]
+# --- End Classifier Settings ---
+
+# Seed exemplars: the examples and category descriptions from the LLM classifier prompts
+SEED_EXAMPLES = {
+    "meeting": [
+        "Can you help me set up a meeting with my friend?", "I want to set up a zoom meeting",
+        "Schedule a call", "Need to meet with someone", "Create a video conference",
+        "Join the zoom call", "Help me organize a meeting",
+    ],
+    "google_calendar": [
+        "Add an event to my calendar", "Create a calendar event for tomorrow at 5 pm",
+        "Put my dentist appointment on the calendar", "Schedule an event on Google Calendar",
+    ],
+    "therapy": [
+        "I need some emotional support", "I feel really stressed and anxious",
+        "Can you activate therapy mode?", "I'm feeling down today and need to talk",
+    ],
+    "notepad": [
+        "Open notepad and write something for me", "Take a note", "Write a document about the meeting",
+        "Can you write information about World War in Notepad?",
+    ],
+    "whatsapp": [
+        "Send a whatsapp message to John", "I would like to send a WhatsApp message",
+        "Message my mom on WhatsApp", "Text Sarah that I'm running late",
+    ],
+    "brightness": [
+        "Increase the screen brightness", "Set brightness to 70 percent", "Make the screen dimmer",
+        "Turn the brightness down",
+    ],
+    "volume": [
+        "Turn the volume up", "Set the volume to 40", "Mute the sound", "Make it louder",
+    ],
+    "visualize": [
+        "Visualize this data for me", "Plot the table on my screen", "Make a chart from this",
+        "Can you graph these numbers?",
+    ],
+    "close_active_apps": [
+        "Close all apps", "Close the active windows", "Can you close the browser?",
+        "Shut all the open applications",
+    ],
+    "news": [
+        "What's the news about tesla", "Tell me today's headlines", "What is happening in the world",
+        "Give me the latest news",
+    ],
+    "retrive-file": [
+        "Retrieve a file for me", "Open the report from my documents", "Find my resume file",
+        "Retrieve student data from downloads",
+    ],
+    "general": [
+        "Tell me a joke", "What is the capital of France?", "How are you doing today?",
+        "Explain how photosynthesis works", "Thank you",
+    ],
+}
+
+# Assistant log lines written by the skill handlers -> the category that produced them
+HISTORY_LABELS = [
+    ("Therapy action initiated", "therapy"),
+    ("Notepad action initiated", "notepad"),
+    ("WhatsApp mode activated", "whatsapp"),
+    ("Zoom mode activated", "meeting"),
+    ("Google Calendar", "google_calendar"),
+    ("Brightness ", "brightness"),
+    ("Volume ", "volume"),
+    ("Attempted to close active applications", "close_active_apps"),
+]
+
+_lock = threading.Lock()
+_encoder = None            # sentence-transformers model, False if unavailable
+_texts = []
+_labels = []
+_matrix = None             # (n, d) float32, rows L2-normalized
+_base_count = 0            # Seed + history rows; rows after them were learned this session
+_loaded = False
+
+# How many turns were routed by kNN vs. passed on to the LLM
+STATS = {"knn": 0, "abstain": 0}
+
+
+# --- Embeddings ---
+def _hashed_embed(texts):
+    """Hashed word + character n-gram features (NumPy only), L2-normalized."""
+    vectors = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = intent_rules.tokenize(text)
+        features = list(words) + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            vectors[row, zlib.crc32(feature.encode("utf-8")) % HASH_DIM] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def _get_encoder():
+    """Load the small CPU sentence-embedding model once; False if it is not installed."""
+    global _encoder
+    if _encoder is None:
+        _encoder = False
+        if USE_TRANSFORMER:
+            try:
+                from sentence_transformers import SentenceTransformer
+                started_at = time.perf_counter()
+                _encoder = SentenceTransformer(EMBED_MODEL, device="cpu")
+                print(f"DEBUG: Loaded intent embedding model in {(time.perf_counter() - started_at) * 1000:.0f} ms")
+            except Exception as e:
+                print(f"WARN: sentence-transformers unavailable ({e}); using hashed n-gram embeddings.")
+    return _encoder
+
+
+def embed(texts):
+    """Embed a list of utterances into L2-normalized float32 rows."""
+    encoder = _get_encoder()
+    if encoder:
+        return np.asarray(encoder.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+    return _hashed_embed(texts)
+
+
+# --- Exemplar bank ---
+def history_examples(paths=HISTORY_FILES):
+    """
+    Labeled (text, category) pairs from the conversation log: a user turn followed by a
+    skill handler's log line gets that skill's category. Only the first existing file is read.
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith(".jsonl"):
+                    messages = [json.loads(line) for line in f if line.strip()]
+                else:
+                    messages = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"WARN: Could not read history for intent exemplars from {path}: {e}")
+            continue
+        examples = []
+        for user, reply in zip(messages, messages[1:]):
+            if user.get("role") != "user" or reply.get("role") != "assistant":
+                continue
+            for prefix, category in HISTORY_LABELS:
+                if (reply.get("content") or "").startswith(prefix):
+                    examples.append((user["content"], category))
+                    break
+        return examples
+    return []
+
+
+def seed_examples():
+    return [(text, category) for category, texts in SEED_EXAMPLES.items() for text in texts]
+
+
+def _ensure_loaded():
+    """Build the exemplar bank (seeds + history) on first use."""
+    global _loaded
+    with _lock:
+        if not _loaded:
+            examples = seed_examples() + history_examples()
+            _set_bank([text for text, _ in examples], [category for _, category in examples])
+            _loaded = True
+            print(f"DEBUG: Intent exemplar bank ready ({len(_texts)} exemplars).")
+
+
+def _set_bank(texts, labels):
+    global _texts, _labels, _matrix, _base_count
+    _texts, _labels = list(texts), list(labels)
+    _matrix = embed(_texts) if _texts else None
+    _base_count = len(_texts)
+
+
+def add_example(text, category):
+    """Add a labeled utterance (e.g. an LLM decision) to the bank for the rest of the session."""
+    if not text or category not in intent_rules.VALID_CATEGORIES:
+        return
+    _ensure_loaded()
+    global _matrix
+    with _lock:
+        vector = embed([text])
+        _matrix = vector if _matrix is None else np.vstack((_matrix, vector))
+        _texts.append(text)
+        _labels.append(category)
+        if len(_texts) - _base_count > MAX_LEARNED_EXAMPLES:
+            # Drop the oldest learned exemplar; seeds and history stay
+            _matrix = np.delete(_matrix, _base_count, axis=0)
+            del _texts[_base_count], _labels[_base_count]
+
+
+def warm_up():
+    """Load the embedding model and bank in a background thread."""
+    threading.Thread(target=_ensure_loaded, name="intent-knn", daemon=True).start()
+
+
+# --- Classification ---
+def _vote(similarities, labels, k=K):
+    """Similarity-weighted vote among the k nearest exemplars."""
+    top = np.argsort(-similarities)[:k]
+    weights = defaultdict(float)
+    best = {}
+    for index in top:
+        weight = max(float(similarities[index]), 0.0)
+        weights[labels[index]] += weight
+        best.setdefault(labels[index], float(similarities[index]))
+    category = max(weights, key=weights.get)
+    total = sum(weights.values()) or 1.0
+    return KnnMatch(category, weights[category] / total, best[category])
+
+
+def classify(text):
+    """Nearest-neighbour category for text (vectorized cosine similarity against the bank)."""
+    _ensure_loaded()
+    with _lock:
+        if _matrix is None:
+            return KnnMatch(None, 0.0, 0.0)
+        similarities = _matrix @ embed([text])[0]
+        return _vote(similarities, _labels)
+
+
+def confident(match, threshold=None):
+    if threshold is None:
+        threshold = MIN_SIMILARITY["transformer" if _get_encoder() else "hashed"]
+    return (match.category is not None and match.category not in NO_KNN_CATEGORIES
+            and match.similarity >= threshold and match.confidence >= MIN_VOTE_SHARE)
+
+
+def predict(text):
+    """Category if the kNN vote is confident, else None (the caller asks the LLM)."""
+    match = classify(text)
+    if confident(match):
+        STATS["knn"] += 1
+        return match.category
+    STATS["abstain"] += 1
+    return None
+
+
+# --- Offline evaluation ---
+def _percentile_ms(samples, q):
+    return float(np.percentile(np.asarray(samples) * 1000, q)) if samples else float("nan")
+
+
+def _loo_matches(examples):
+    """(match, expected, seconds) per example, each classified against the bank without itself."""
+    _ensure_loaded()
+    bank_texts, bank_labels = list(_texts), list(_labels)
+    matrix = _matrix
+    results = []
+    for text, expected in examples:
+        started_at = time.perf_counter()
+        similarities = matrix @ embed([text])[0]
+        similarities[[i for i, bank_text in enumerate(bank_texts) if bank_text == text]] = -1.0  # Leave it out
+        results.append((_vote(similarities, bank_labels), expected, time.perf_counter() - started_at))
+    return results
+
+
+def evaluate(examples, use_llm=True):
+    """
+    Leave-one-out evaluation on labeled (text, category) pairs: each utterance is
+    classified against the bank without itself. Optionally runs the live LLM analysis
+    (analysis.analyze_with_llm) on the same inputs; that comparison is only meaningful
+    on independently labeled data, since history labels come from the LLM.
+    """
+    knn_correct = knn_answered = 0
+    knn_latency = []
+    llm_correct = 0
+    llm_latency = []
+    analyze_with_llm = None
+    if use_llm:
+        import analysis  # Only for the comparison run
+        analyze_with_llm = analysis.analyze_with_llm
+
+    for (match, expected, seconds), (text, _) in zip(_loo_matches(examples), examples):
+        knn_latency.append(seconds)
+        if confident(match):
+            knn_answered += 1
+            knn_correct += match.category == expected
+
+        if analyze_with_llm is not None:
+            started_at = time.perf_counter()
+            parsed = analyze_with_llm(text) or {}
+            predicted = intent_rules.resolve(intent_rules.match(text), str(parsed.get("category") or "").strip().lower())
+            llm_latency.append(time.perf_counter() - started_at)
+            llm_correct += predicted == expected
+
+    total = len(examples)
+    report = {
+        "examples": total,
+        "knn_coverage": knn_answered / total if total else 0.0,
+        "knn_accuracy_when_answered": knn_correct / knn_answered if knn_answered else 0.0,
+        "knn_p50_ms": _percentile_ms(knn_latency, 50),
+        "knn_p99_ms": _percentile_ms(knn_latency, 99),
+    }
+    if use_llm:
+        report.update({
+            "llm_accuracy": llm_correct / total if total else 0.0,
+            "llm_p50_ms": _percentile_ms(llm_latency, 50),
+            "llm_p99_ms": _percentile_ms(llm_latency, 99),
+        })
+    return report
+
+
+def calibrate(examples, min_accuracy=0.95, thresholds=None):
+    """
+    Sweep the similarity threshold on calibration examples. Returns the lowest threshold whose
+    accuracy when answering reaches min_accuracy (None if none does) and the sweep rows
+    (threshold, coverage, accuracy).
+    """
+    matches = _loo_matches(examples)
+    thresholds = thresholds if thresholds is not None else [round(0.30 + 0.05 * i, 2) for i in range(11)]
+    rows = []
+    chosen = None
+    for threshold in thresholds:
+        answered = [(match, expected) for match, expected, _ in matches if confident(match, threshold)]
+        accuracy = sum(match.category == expected for match, expected in answered) / len(answered) if answered else 1.0
+        rows.append((threshold, len(answered) / len(matches) if matches else 0.0, accuracy))
+        if chosen is None and answered and accuracy >= min_accuracy:
+            chosen = threshold
+    return chosen, rows
+
+
+def load_eval_file(path):
+    """Labeled eval set: JSONL lines of {"text": ..., "category": ...}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(row["text"], row["category"]) for row in map(json.loads, filter(str.strip, f))]
+
+
+if __name__ == "__main__":
+    # Usage: python intent_knn.py --eval [labeled.jsonl] [--no-llm]
+    #        python intent_knn.py --calibrate [labeled.jsonl]
+    # --calibrate defaults to intent_calibration.jsonl, --eval to the held-out intent_eval.jsonl
+    args = sys.argv[1:]
+    if not args or args[0] not in ("--eval", "--calibrate"):
+        print("Usage: python intent_knn.py --eval [labeled.jsonl] [--no-llm]")
+        print("       python intent_knn.py --calibrate [labeled.jsonl]")
+        sys.exit(1)
+    files = [arg for arg in args[1:] if not arg.startswith("--")]
+
+    if args[0] == "--calibrate":
+        calibration_path = files[0] if files else CALIBRATION_FILE
+        threshold, sweep = calibrate(load_eval_file(calibration_path))
+        print(f"📊 Similarity threshold sweep on {calibration_path} ({'transformer' if _get_encoder() else 'hashed'} embeddings)")
+        for value, coverage, accuracy in sweep:
+            print(f"   {value:.2f}: answered {coverage:.0%}, accuracy {accuracy:.0%}")
+        print(f"   Lowest threshold reaching 95% accuracy: {threshold}")
+        sys.exit(0)
+
+    eval_path = files[0] if files else EVAL_FILE
+    if os.path.exists(eval_path):
+        eval_examples, labeled = load_eval_file(eval_path), True
+    else:
+        eval_examples, labeled = history_examples() + seed_examples(), False
+    use_llm = "--no-llm" not in args
+    if use_llm and not labeled:
+        # History labels were produced by the LLM classifier itself, so it would be graded against its own answers
+        print("WARN: No labeled eval file; skipping the LLM comparison (history labels come from the LLM).")
+        use_llm = False
+    results = evaluate(eval_examples, use_llm=use_llm)
+    source = eval_path if labeled else "seed exemplars and history labels (leave-one-out)"
+    print(f"📊 Intent classifier evaluation on {results['examples']} labeled utterances from {source}")
+    print(f"   kNN: answered {results['knn_coverage']:.0%}, accuracy {results['knn_accuracy_when_answered']:.0%} "
+          f"when answering, p50 {results['knn_p50_ms']:.2f} ms, p99 {results['knn_p99_ms']:.2f} ms")
+    if "llm_accuracy" in results:
+        print(f"   LLM: accuracy {results['llm_accuracy']:.0%}, "
+              f"p50 {results['llm_p50_ms']:.0f} ms, p99 {results['llm_p99_ms']:.0f} ms")
@@ -0,0 +1,130 @@
+# intent_rules.py
+
+import re
+import string
+from collections import namedtuple
+
+# Result of the local rule engine.
+#   category:   best category, or None if nothing matched
+#   confidence: 1.0 for a single unambiguous match, lower when several categories matched
+#   candidates: every category that matched, in priority order
+RuleMatch = namedtuple("RuleMatch", ["category", "confidence", "candidates"])
+
+# Confidence at or above this is trusted without asking the LLM
+CONFIDENT = 0.9
+
+# Allowed outputs of the intent classifier
+VALID_CATEGORIES = [
+    "therapy", "notepad", "whatsapp", "meeting", "brightness",
+    "translate", "volume", "visualize", "spotify", "close_active_apps",
+    "google_calendar", "web-application", "code",
+    "retrive-file", "general", "gemini", "news"
+]
+
+# How many turns were routed by the local rules vs. the LLM
+STATS = {"fast_path": 0, "llm": 0}
+
+# Categories in priority order (same order as the old keyword overrides in base.py)
+PRIORITY = [
+    "close_active_apps", "google_calendar", "volume", "brightness", "meeting",
+    "retrive-file", "visualize", "news", "notepad", "whatsapp",
+]
+
+# Whole-word phrases -> category. Multi-word phrases are matched token by token.
+PHRASES = {
+    "google_calendar": ["calendar", "schedule", "scheduled", "appointment", "appointments",
+                        "add to calendar", "create event", "schedule event"],
+    "volume": ["volume", "sound", "audio level", "mute", "unmute"],
+    "brightness": ["brightness", "screen", "dim", "dimmer", "brighter"],
+    "meeting": ["zoom", "meeting", "meetings", "conference", "video conference"],
+    "visualize": ["visualize", "visualise", "plot", "graph", "chart"],
+    "news": ["news", "headlines", "headline", "latest events"],
+    "notepad": ["notepad", "note", "notes", "write down"],
+    "whatsapp": ["whatsapp", "send message", "send a message", "text", "text message"],
+}
+
+# Rules that need more than one keyword anywhere in the sentence
+REGEX_RULES = {
+    "close_active_apps": re.compile(r"^(?=.*\bclose\b)(?=.*\b(?:apps?|applications?|windows?)\b)"),
+    "retrive-file": re.compile(r"^(?=.*\b(?:retrieve|open|find|get)\b)(?=.*\b(?:files?|documents?|docs?)\b)"),
+}
+
+_PUNCT_TABLE = str.maketrans({ch: " " for ch in string.punctuation if ch != "'"})
+
+
+def _build_trie(phrases):
+    """Build a token trie; the '$' key on a node holds the category of a complete phrase."""
+    trie = {}
+    for category, words in phrases.items():
+        for phrase in words:
+            node = trie
+            for token in phrase.split():
+                node = node.setdefault(token, {})
+            node["$"] = category
+    return trie
+
+
+# Built once at import so matching is a dictionary walk per token
+_TRIE = _build_trie(PHRASES)
+
+
+def tokenize(text):
+    """Lowercase the text and split it into words, dropping punctuation."""
+    return text.lower().translate(_PUNCT_TABLE).split()
+
+
+def match(text):
+    """
+    Resolve an utterance to a category using only local rules.
+
+    Returns:
+        RuleMatch: category None / confidence 0.0 when no rule fires.
+    """
+    normalized = " ".join(tokenize(text))
+    found = set()
+
+    for category, pattern in REGEX_RULES.items():
+        if pattern.search(normalized):
+            found.add(category)
+
+    tokens = normalized.split()
+    for start in range(len(tokens)):
+        node = _TRIE
+        for token in tokens[start:]:
+            node = node.get(token)
+            if node is None:
+                break
+            if "$" in node:
+                found.add(node["$"])
+
+    if not found:
+        return RuleMatch(None, 0.0, [])
+
+    candidates = [category for category in PRIORITY if category in found]
+    confidence = 1.0 if len(candidates) == 1 else 0.5
+    return RuleMatch(candidates[0], confidence, candidates)
+
+
+def resolve(rule, llm_category):
+    """
+    Combine a low-confidence RuleMatch with the category the LLM returned.
+
+    When several keyword categories matched, the LLM may pick between them; anything
+    else falls back to the keyword priority order. Without keyword matches the LLM
+    answer is used if it is a valid category, otherwise "general".
+    """
+    if rule.candidates:
+        return llm_category if llm_category in rule.candidates else rule.category
+    if not llm_category:
+        print("WARN: LLM classification returned empty and no keywords matched, defaulting to 'general'.")
+        return "general"
+    if llm_category not in VALID_CATEGORIES:
+        print(f"WARN: Unexpected category classification '{llm_category}', defaulting to 'general'.")
+        return "general"
+    return llm_category
+
+
+if __name__ == "__main__":
+    for phrase in ["turn the volume up", "open my file from downloads", "schedule a zoom meeting",
+                   "close all the apps", "tell me a joke", "take a note about the meeting"]:
+        print(f"'{phrase}' -> {match(phrase)}")
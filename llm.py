@@ -0,0 +1,59 @@
+# llm.py
+
+import llm_cache
+
+
+def complete_text(client, site="general", ttl=None, **kwargs):
+    """
+    Run a chat completion and return the message text, served from the response cache when possible.
+
+    Parameters:
+      - client: a Groq (or OpenAI-compatible) client.
+      - site: call-site name, used for the cache TTL (llm_cache.SITE_TTL_SECONDS) and the hit/miss stats.
+      - ttl: overrides the site's TTL in seconds.
+      - kwargs: passed to client.chat.completions.create (model, messages, ...).
+
+    API errors are raised, as with client.chat.completions.create.
+    """
+    key, text = llm_cache.lookup(site, kwargs, ttl)
+    if text is not None:
+        return text
+    response = client.chat.completions.create(**kwargs)
+    text = response.choices[0].message.content if response and response.choices else None
+    if key is not None and text:
+        llm_cache.put(key, site, text)
+    return text
+
+
+def stream_text(client, error_message="Sorry, I encountered an error trying to respond.", site="general", ttl=None, **kwargs):
+    """
+    Run a streaming chat completion and yield the text deltas as they arrive.
+
+    Parameters:
+      - client: a Groq (or OpenAI-compatible) client.
+      - error_message: spoken instead if the request fails before any text arrived.
+      - site, ttl: as for complete_text; a cached answer is yielded in one piece.
+      - kwargs: passed to client.chat.completions.create (model, messages, ...).
+    """
+    key, text = llm_cache.lookup(site, kwargs, ttl)
+    if text is not None:
+        yield text
+        return
+    produced = []
+    try:
+        stream = client.chat.completions.create(stream=True, **kwargs)
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                produced.append(delta)
+                yield delta
+    except Exception as e:
+        print(f"ERROR in stream_text ({kwargs.get('model')}): {e}")
+        if not produced:
+            yield error_message
+        return
+    # Only complete answers are cached
+    if key is not None and produced:
+        llm_cache.put(key, site, "".join(produced))
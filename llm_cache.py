@@ -0,0 +1,160 @@
+# llm_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- LLM Cache Settings ---
+DB_PATH = os.path.join(os.path.dirname(__file__), "llm_cache.sqlite3")
+MEMORY_ENTRIES = 512            # In-memory LRU size
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+# Per-call-site time to live for the deterministic (cacheable) sites; 0 disables caching for a site
+SITE_TTL_SECONDS = {
+    "exit": 7 * 24 * 3600,       # Classifications depend only on the utterance
+    "analysis": 7 * 24 * 3600,
+    "zoom": 3600,                # "Tomorrow" means something else after midnight
+}
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+# --- End LLM Cache Settings ---
+
+# Sampling parameters that change the response; everything else (stream, timeouts) is ignored for the key
+KEY_PARAMS = ("temperature", "top_p", "max_tokens", "max_completion_tokens", "stop", "seed",
+              "response_format", "reasoning_format", "frequency_penalty", "presence_penalty")
+
+_memory = OrderedDict()  # key -> (created_at, text), most recently used last
+_lock = threading.Lock()
+_db = None
+
+# Session counters per call site: {"site": {"hits", "misses", "uncacheable"}}
+STATS = {}
+
+
+def _count(site, field):
+    counters = STATS.setdefault(site, {"hits": 0, "misses": 0, "uncacheable": 0})
+    counters[field] += 1
+
+
+def normalize_messages(messages):
+    """Messages with whitespace runs collapsed, so reformatted prompts share an entry."""
+    normalized = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = " ".join(content.split())
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+
+def is_cacheable(params):
+    """Only deterministic requests are cached: greedy decoding (temperature 0) or an explicit seed."""
+    if (params.get("n") or 1) > 1:
+        return False
+    return params.get("temperature") == 0 or params.get("seed") is not None
+
+
+def make_key(params):
+    """sha256 over (model, normalized messages, sampling params)."""
+    payload = {
+        "model": params.get("model"),
+        "messages": normalize_messages(params.get("messages")),
+        "params": {name: params[name] for name in KEY_PARAMS if params.get(name) is not None},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def site_ttl(site, ttl=None):
+    if ttl is not None:
+        return ttl
+    return SITE_TTL_SECONDS.get(site, DEFAULT_TTL_SECONDS)
+
+
+def _connect():
+    """Open (and create) the SQLite store on first use. Caller holds _lock."""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                site TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+    return _db
+
+
+def _remember(key, created_at, text):
+    """Insert into the in-memory LRU, evicting the least recently used entry. Caller holds _lock."""
+    _memory[key] = (created_at, text)
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(key, ttl):
+    """Cached text for key if younger than ttl seconds (memory first, then SQLite), else None."""
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            try:
+                row = _connect().execute("SELECT created_at, text FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"WARN: LLM cache read failed: {e}")
+                return None
+            if row is None:
+                return None
+            entry = (row[0], row[1])
+        if now - entry[0] >= ttl:
+            _memory.pop(key, None)
+            return None
+        _remember(key, *entry)
+        return entry[1]
+
+
+def put(key, site, text):
+    """Store a response in memory and SQLite."""
+    created_at = time.time()
+    with _lock:
+        _remember(key, created_at, text)
+        try:
+            db = _connect()
+            with db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, site, created_at, text))
+        except sqlite3.Error as e:
+            print(f"WARN: LLM cache write failed: {e}")
+
+
+def lookup(site, params, ttl=None):
+    """
+    (key, text) for a request. key is None when the request must not be cached;
+    text is None on a miss. Updates the per-site hit/miss counters.
+    """
+    ttl = site_ttl(site, ttl)
+    if not CACHE_ENABLED or ttl <= 0 or not is_cacheable(params):
+        _count(site, "uncacheable")
+        return None, None
+    key = make_key(params)
+    text = get(key, ttl)
+    _count(site, "hits" if text is not None else "misses")
+    if text is not None:
+        print(f"DEBUG: LLM cache hit for '{site}' (stats={STATS[site]})")
+    return key, text
+
+
+def clear_expired(max_age=None):
+    """Delete SQLite entries older than max_age (default: the longest site TTL)."""
+    max_age = max_age or max([DEFAULT_TTL_SECONDS, *SITE_TTL_SECONDS.values()])
+    with _lock:
+        try:
+            db = _connect()
+            with db:
+                db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - max_age,))
+        except sqlite3.Error as e:
+            print(f"WARN: LLM cache cleanup failed: {e}")
@@ -1,105 +1,23 @@
-import requests
-import json
 import os
 import re
-from datetime import datetime
-import groq
-from audio import listen, speak
+import llm
+import transport
+import news_index
+from exit import is_exit_command
+from news_feed import fetch_live_news, get_headlines, session_index
+from audio import listen, speak, speak_stream, speak_many, enqueue_speech
 from dotenv import load_dotenv
 load_dotenv()
 
 
-NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # ---- CONFIGURATION ----
 
-NEWS_ENDPOINT = "https://newsapi.org/v2/everything"
-OUTPUT_DIR = "news_data"
 MODEL_NAME = "llama3-70b-8192"
 
 # ---- SETUP ----
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-client = groq.Groq(api_key=GROQ_API_KEY)
-
-# ---- FETCH NEWS ----
-def fetch_live_news(query=None, page_size=3): # Default page_size to 3
-    params = {
-        "apiKey": NEWS_API_KEY,
-        "language": "en",
-        "pageSize": page_size, # Use the page_size parameter
-        "sortBy": "publishedAt" # Sort by latest
-    }
-    # If no query, fetch top headlines instead of using 'latest' keyword
-    if not query:
-        params["endpoint"] = "top-headlines" # Use top-headlines endpoint
-        # Remove 'q' if it exists from default params if no query provided
-        params.pop("q", None)
-        # Add country or category if desired for top headlines, e.g., 'us'
-        # params["country"] = "us"
-        news_fetch_url = "https://newsapi.org/v2/top-headlines" # URL for top headlines
-    else:
-        params["q"] = query
-        news_fetch_url = NEWS_ENDPOINT # URL for everything endpoint
-
-    try:
-        # Use the determined URL
-        response = requests.get(news_fetch_url, params=params)
-        response.raise_for_status()
-        articles = response.json().get("articles", [])
-        # --- REMOVE THIS BLOCK ---
-        # Keep filtering logic if a specific query was provided
-        # if query:
-        #     query_lower = query.lower()
-        #     filtered_articles = []
-        #     for article in articles:
-        #         title = article.get('title', '').lower()
-        #         description = article.get('description', '').lower()
-        #         if query_lower in title or query_lower in description:
-        #             filtered_articles.append(article)
-        #     articles = filtered_articles # Overwrite with filtered list
-        # --- END OF REMOVED BLOCK ---
-
-        if not articles:
-            if query:
-                print(f"❌ No articles found specifically about '{query}'.")
-            else:
-                print("❌ No top headlines found.")
-            return []
-
-        # Ensure we only save up to the requested page_size (e.g., 3)
-        articles = articles[:page_size]
-
-        saved_files = []
-        # Use min(len(articles), page_size) in case fewer than page_size articles were returned
-        for idx, article in enumerate(articles, 1):
-            title = article.get('title') or ''
-            description = article.get('description') or ''
-            content = article.get('content') or ''
-
-            full_article_data = {
-                "title": title,
-                "description": description,
-                "full_text": content,
-                "url": article.get('url'),
-                "publishedAt": article.get('publishedAt'),
-                "source": article.get('source', {}).get('name'),
-                "scraped_at": datetime.now().isoformat()
-            }
-
-            filename = f"{OUTPUT_DIR}/article_{idx}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(full_article_data, f, indent=2, ensure_ascii=False)
-            saved_files.append(filename)
-            print(f"✅ Saved: {filename}")
-
-        return saved_files
-
-    except Exception as e:
-        print(f"❌ Error fetching news: {e}")
-        return []
+client = transport.get_groq_client()
 
 # ---- BUILD CONTEXT FOR ALL ARTICLES ----
 def build_articles_context(articles):
@@ -114,7 +32,7 @@ def build_articles_context(articles):
     return context
 
 # ---- ANALYZE QUESTION WITH ALL ARTICLES ----
-def analyze_with_groq(all_articles_context, question):
+def analyze_with_groq(all_articles_context, question, stream=False):
     prompt = f"""You are an intelligent news assistant.
 Below are multiple news articles:
 
@@ -125,67 +43,55 @@ Based on the above articles, answer the user's question:
 QUESTION: {question}
 """
 
+    if stream:
+        return llm.stream_text(client, error_message="Sorry, the analysis failed.", site="news_analysis",
+                               model=MODEL_NAME, messages=[{"role": "user", "content": prompt}])
+
     try:
-        response = client.chat.completions.create(
+        return llm.complete_text(
+            client,
+            site="news_analysis",
             model=MODEL_NAME,
             messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
+        ).strip()
     except Exception as e:
         return f"⚠️ Analysis failed: {str(e)}"
 
-# ---- INTENT CHECK ----
-def check_user_intent(user_input):
-    prompt = f"""You are a control system.
-Analyze the following user statement:
-
-"{user_input}"
-
-If the user wants to stop, exit, close the program, end the conversation, or terminate — respond ONLY with the single word: EXIT.
-If the user wants to continue, respond ONLY with: CONTINUE.
-NO extra words.
-"""
-
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        decision = response.choices[0].message.content.strip()
-        return decision
-    except Exception as e:
-        print(f"❌ Intent checking failed: {e}")
-        return "CONTINUE"
-
-# ---- DETECT IF FRESH NEWS NEEDED ----
-def needs_new_fetch(user_question, articles_data):
-    user_question_lower = user_question.lower()
-    for article in articles_data:
-        title = article.get('title', '').lower()
-        if any(word in title for word in user_question_lower.split()):
-            return False
-    return True
+# ---- PICK CONTEXT FOR A QUESTION ----
+def build_question_context(question, fallback_context):
+    """Top BM25 passages from every article fetched this session, or the current articles if nothing matches."""
+    hits = session_index.search(question)
+    if not hits:
+        return fallback_context
+    print(f"DEBUG: Using {len(hits)} passages from {len(session_index)} indexed for the question.")
+    return news_index.build_passages_context(hits)
 
 # ---- CLEAN QUERY FROM USER SPEECH ----
+# Phrases that indicate a request for news, to be removed (longest first)
+REQUEST_PHRASES = sorted([
+    "what is the news about", "what's the news about", "what's new with",
+    "tell me the news about", "tell me about", "find news about", "search for news about",
+    "search for", "find", "news related to", "news on", "news about",
+    "give me news about", "i want to know about", "i want to hear about",
+    "what about", "get news on", "show me news about", "latest on",
+    "i want listen a new topic", "give me news which is related to" # Added more specific phrase
+], key=len, reverse=True)
+# The ones that ask for news on a topic, rather than about something in the current articles
+TOPIC_REQUEST_PHRASES = [phrase for phrase in REQUEST_PHRASES
+                         if "news" in phrase or "search" in phrase or "latest" in phrase or "topic" in phrase]
+
+# Topics fetched this session; a new one is always fetched, whatever the index holds
+queried_topics = set()
+
 def clean_query(raw_query):
     """Cleans user speech to extract the real search topic."""
     text = raw_query.lower()
 
-    # Define phrases that indicate a request for news, to be removed
-    request_phrases = [
-        "what is the news about", "what's the news about", "what's new with",
-        "tell me the news about", "tell me about", "find news about", "search for news about",
-        "search for", "find", "news related to", "news on", "news about",
-        "give me news about", "i want to know about", "i want to hear about",
-        "what about", "get news on", "show me news about", "latest on",
-        "i want listen a new topic", "give me news which is related to" # Added more specific phrase
-    ]
     # Define common filler words to remove
     filler_words = ["okay", "please", "can you", "could you", "like", "uh", "um"]
 
     # Remove the longest matching request phrase first
-    request_phrases.sort(key=len, reverse=True)
-    for phrase in request_phrases:
+    for phrase in REQUEST_PHRASES:
         if text.startswith(phrase + " "):
             text = text[len(phrase):].strip()
             break # Stop after removing one starting phrase
@@ -217,31 +123,42 @@ def clean_query(raw_query):
     # Let's return empty for now, fetch_live_news handles empty query by getting top headlines.
     return cleaned_query if cleaned_query else ""
 
+def explicit_topic(raw_query):
+    """The cleaned topic if the user explicitly asked for news on it ("news about X"), else ""."""
+    text = raw_query.lower().strip()
+    if any(text.startswith(phrase + " ") for phrase in TOPIC_REQUEST_PHRASES):
+        return clean_query(raw_query)
+    return ""
+
 # ---- MAIN ----
-def news_mode():
+def news_mode(topic=None):
     print("📡 Welcome to Voice NewsBot 2.0!")
-    speak("Fetching the latest top 3 news headlines for you.")
+    topic = clean_query(topic) if topic else ""
+    # Queued, so the fetch runs while the preamble is being spoken
+    if topic:
+        enqueue_speech(f"Fetching the latest news about {topic} for you.")
+    else:
+        enqueue_speech("Fetching the latest top 3 news headlines for you.")
 
-    # Initial fetch for top 3 news (no query)
-    json_files = fetch_live_news(page_size=3) # Explicitly fetch 3
+    # Initial fetch for top 3 news (top headlines unless a topic was requested)
+    # Top headlines are kept warm by the background refresher, so they are served instantly
+    articles_data = fetch_live_news(query=topic, page_size=3) if topic else get_headlines(page_size=3)
+    if topic:
+        queried_topics.add(topic)
 
-    if not json_files:
+    if not articles_data:
         speak("Sorry, I couldn't fetch the top news right now. Please try again later.")
         return # Exit news_mode if initial fetch fails
 
-    articles_data = []
-    for file in json_files:
-        with open(file, 'r', encoding='utf-8') as f:
-            articles_data.append(json.load(f))
-
     print("\n📰 Top 3 News Headlines:")
-    speak("Here are the top 3 news headlines:")
-    for idx, article in enumerate(articles_data, 1):
-        speak(f"{idx}. {article.get('title')}")
+    intro = f"Here are the latest headlines about {topic}:" if topic else "Here are the top 3 news headlines:"
+    # All headlines synthesize concurrently and play back to back
+    speak_many([intro] + [f"{idx}. {article.get('title')}" for idx, article in enumerate(articles_data, 1)])
+    session_index.add_articles(articles_data)
 
     # Build initial context
     all_articles_context = build_articles_context(articles_data)
-    current_topic = "Top Headlines" # Keep track of the current context
+    current_topic = topic or "Top Headlines" # Keep track of the current context
 
     # Conversation loop
     while True:
@@ -252,9 +169,8 @@ def news_mode():
         if not user_question:
             continue
 
-        # Check for exit intent first
-        decision = check_user_intent(user_question)
-        if decision == "EXIT":
+        # Check for exit intent first (decided locally unless the phrasing is ambiguous)
+        if is_exit_command(user_question):
             print("\n👋 Exit intent detected. Leaving news mode.")
             speak("Okay, leaving news mode now. Goodbye!")
             return # Exit the news_mode function
@@ -263,32 +179,34 @@ def news_mode():
         cleaned_topic_query = clean_query(user_question)
         print(f"DEBUG: Cleaned query for new topic: '{cleaned_topic_query}'")
 
-        # Decide if a new fetch is needed
-        # Simpler logic: Fetch if the cleaned query is not empty AND
-        # it's different from the current topic (or if current topic is still the default).
-        needs_fetch = (bool(cleaned_topic_query) and
+        # Decide if a new fetch is needed: always for a topic the user explicitly asks
+        # news about for the first time, otherwise only if the articles fetched this
+        # session are not about the question
+        requested_topic = explicit_topic(user_question)
+        new_topic = bool(requested_topic) and requested_topic not in queried_topics
+        covered = session_index.covers(user_question)
+        print(f"DEBUG: Index coverage for question: {session_index.coverage(user_question):.2f}")
+        needs_fetch = (bool(cleaned_topic_query) and (new_topic or not covered) and
                        (current_topic == "Top Headlines" or cleaned_topic_query != current_topic.lower()))
 
         if needs_fetch:
             print(f"\n🔄 Fetching news related to: '{cleaned_topic_query}'...")
-            speak(f"Okay, looking for news about {cleaned_topic_query}.")
+            enqueue_speech(f"Okay, looking for news about {cleaned_topic_query}.")
             # Pass the cleaned query to the API
-            new_json_files = fetch_live_news(query=cleaned_topic_query, page_size=3)
+            new_articles = fetch_live_news(query=cleaned_topic_query, page_size=3)
+            queried_topics.add(cleaned_topic_query)
 
-            if new_json_files:
+            if new_articles:
                 # Update context if new articles were found
-                articles_data = []
-                for file in new_json_files:
-                    with open(file, 'r', encoding='utf-8') as f:
-                        articles_data.append(json.load(f))
+                articles_data = new_articles
                 all_articles_context = build_articles_context(articles_data)
                 # Use the cleaned query as the new topic name
                 current_topic = cleaned_topic_query # Update the current topic
 
                 print("\n📰 New Headlines:")
-                speak(f"Here are the latest headlines about {current_topic}:")
-                for idx, article in enumerate(articles_data, 1):
-                    speak(f"{idx}. {article.get('title')}")
+                speak_many([f"Here are the latest headlines about {current_topic}:"] +
+                           [f"{idx}. {article.get('title')}" for idx, article in enumerate(articles_data, 1)])
+                session_index.add_articles(articles_data)
 
                 # Analyze the original question against the NEW context
                 # It might be better to just present the headlines and wait for the next question
@@ -306,9 +224,14 @@ def news_mode():
             # If not a new topic request (cleaned query was empty or same as current topic),
             # analyze the question against current articles
             print("\n🤖 Analyzing your question against current articles...")
-            answer = analyze_with_groq(all_articles_context, user_question) # Use original question
+            # Only the best-matching passages go into the prompt
+            question_context = build_question_context(user_question, all_articles_context)
+            # Use original question; the answer is spoken sentence by sentence as it streams
+            answer = speak_stream(analyze_with_groq(question_context, user_question, stream=True))
+            print("\n🧠 Answer:", answer)
+            continue
 
-        # Speak the answer (either the analysis result or the placeholder after fetch)
+        # Speak the placeholder answer after a fetch
         print("\n🧠 Answer:", answer)
         speak(answer)
 
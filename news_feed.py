@@ -0,0 +1,156 @@
+# news_feed.py
+
+import os
+import time
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+import transport
+import news_store
+import news_index
+
+# Load environment variables
+load_dotenv()
+
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+
+# ---- CONFIGURATION ----
+NEWS_ENDPOINT = "https://newsapi.org/v2/everything"
+TOP_HEADLINES_ENDPOINT = "https://newsapi.org/v2/top-headlines"
+HEADLINE_PAGE_SIZE = 3
+# Background refresh period: hourly stays at ~24 requests a day, well inside NewsAPI's free developer quota
+HEADLINE_REFRESH_SECONDS = float(os.getenv("NEWS_HEADLINE_REFRESH_SECONDS", "3600"))
+
+# Every article news mode has served this session, so follow-ups can be answered without refetching.
+# Prefetched headlines stay in news_store until the user has actually heard them.
+session_index = news_index.NewsIndex()
+
+_refresher = None
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+# ---- FETCH NEWS ----
+def to_article(article):
+    """Flatten a NewsAPI article into the dict the rest of news mode uses."""
+    return {
+        "title": article.get('title') or '',
+        "description": article.get('description') or '',
+        "full_text": article.get('content') or '',
+        "url": article.get('url'),
+        "publishedAt": article.get('publishedAt'),
+        "source": (article.get('source') or {}).get('name'),
+        "scraped_at": datetime.now().isoformat()
+    }
+
+def fetch_live_news(query=None, page_size=3, max_age=None): # Default page_size to 3
+    """
+    Return up to page_size article dicts for query (top headlines if no query).
+    Results younger than max_age (default: the cache TTL) come from news_store without
+    a request; older ones are revalidated with a conditional request, and served stale
+    if the network fails.
+    """
+    # If no query, fetch top headlines instead of using 'latest' keyword
+    news_fetch_url = NEWS_ENDPOINT if query else TOP_HEADLINES_ENDPOINT
+    key = news_store.make_key(news_fetch_url, query, page_size)
+    cached = news_store.lookup(key)
+    if news_store.is_fresh(cached, news_store.TTL_SECONDS if max_age is None else max_age):
+        news_store.STATS["fresh_hits"] += 1
+        print(f"DEBUG: News cache hit for '{query or 'top headlines'}'.")
+        return cached["articles"]
+
+    params = {
+        "apiKey": NEWS_API_KEY,
+        "language": "en",
+        "pageSize": page_size, # Use the page_size parameter
+        "sortBy": "publishedAt" # Sort by latest
+    }
+    if query:
+        params["q"] = query
+
+    try:
+        response = transport.get_session().get(news_fetch_url, params=params,
+                                               headers=news_store.conditional_headers(cached))
+        if response.status_code == 304 and cached is not None:
+            news_store.STATS["revalidated"] += 1
+            print(f"DEBUG: News for '{query or 'top headlines'}' not modified; using cache.")
+            articles = news_store.touch(key)["articles"]
+            return articles
+        response.raise_for_status()
+        articles = response.json().get("articles", [])
+
+        if not articles:
+            if query:
+                print(f"❌ No articles found specifically about '{query}'.")
+            else:
+                print("❌ No top headlines found.")
+            return []
+
+        # Deduplicate syndicated copies, then keep only the requested page_size (e.g., 3)
+        articles = news_store.dedupe([to_article(article) for article in articles])[:page_size]
+        news_store.put(key, articles, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        news_store.STATS["fetched"] += 1
+        return articles
+
+    except Exception as e:
+        print(f"❌ Error fetching news: {e}")
+        if cached is not None:
+            print("⚠️ Using the last cached articles instead.")
+            return cached["articles"]
+        return []
+
+# ---- STALE-WHILE-REVALIDATE ----
+def revalidate_async(query=None, page_size=3):
+    """Refresh a cached result in a background thread (at most one refresh per key at a time)."""
+    key = news_store.make_key(NEWS_ENDPOINT if query else TOP_HEADLINES_ENDPOINT, query, page_size)
+    with _in_flight_lock:
+        if key in _in_flight:
+            return
+        _in_flight.add(key)
+
+    def run():
+        try:
+            fetch_live_news(query, page_size)
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(key)
+
+    threading.Thread(target=run, name="news-revalidate", daemon=True).start()
+
+
+def get_headlines(page_size=HEADLINE_PAGE_SIZE):
+    """
+    Top headlines without waiting on NewsAPI whenever any snapshot exists: a stale
+    snapshot (possibly from an earlier session) is returned at once and refreshed in the
+    background. Only an empty cache makes this call block on the network.
+    """
+    key = news_store.make_key(TOP_HEADLINES_ENDPOINT, None, page_size)
+    cached = news_store.lookup(key)
+    if cached is None or not cached["articles"]:
+        return fetch_live_news(None, page_size)
+    if not news_store.is_fresh(cached):
+        print("DEBUG: Serving cached headlines; refreshing in the background.")
+        revalidate_async(None, page_size)
+    return cached["articles"]
+
+
+def _refresh_loop(interval):
+    while True:
+        started_at = time.perf_counter()
+        # Only a snapshot older than the cache TTL costs a request; a fresh one is left alone
+        fetch_live_news(None, HEADLINE_PAGE_SIZE, max_age=news_store.TTL_SECONDS)
+        print(f"DEBUG: Headlines checked in the background in {(time.perf_counter() - started_at) * 1000:.0f} ms "
+              f"(stats={news_store.STATS})")
+        time.sleep(interval)
+
+
+def start_refresher(interval=HEADLINE_REFRESH_SECONDS):
+    """Keep top headlines warm from assistant startup on (daemon thread; no-op if already running)."""
+    global _refresher
+    if _refresher is not None and _refresher.is_alive():
+        return
+    if not NEWS_API_KEY:
+        print("WARN: NEWS_API_KEY not set; headline prefetch disabled.")
+        return
+    _refresher = threading.Thread(target=_refresh_loop, args=(interval,), name="news-refresher", daemon=True)
+    _refresher.start()
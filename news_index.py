@@ -0,0 +1,144 @@
+# news_index.py
+
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+
+# --- Index Settings ---
+K1 = 1.5
+B = 0.75
+PASSAGE_WORDS = 60          # Article text is split into passages of about this many words
+TOP_PASSAGES = 5            # Passages sent to the LLM for a question
+COVERAGE_THRESHOLD = 0.6    # Share of the question's content words its top passages must be about
+COVERAGE_MIN_PASSAGES = 2   # Top passages a word must recur in to count without being in a title
+# --- End Index Settings ---
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "about", "from",
+    "by", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those",
+    "what", "whats", "which", "who", "whom", "why", "how", "when", "where", "do", "does", "did",
+    "i", "me", "my", "you", "your", "we", "us", "they", "them", "he", "she", "his", "her",
+    "can", "could", "would", "should", "will", "tell", "say", "said", "says", "give", "know",
+    "more", "any", "some", "there", "here", "so", "please", "s", "t",
+    "news", "latest", "article", "articles", "headline", "headlines", "story", "stories",
+}
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def split_passages(article):
+    """Title + description as one passage, then the body in PASSAGE_WORDS-sized chunks."""
+    title = article.get("title") or ""
+    passages = [f"{title}. {article.get('description') or ''}".strip()]
+    words = (article.get("full_text") or "").split()
+    for start in range(0, len(words), PASSAGE_WORDS):
+        passages.append(f"{title}: " + " ".join(words[start:start + PASSAGE_WORDS]))
+    return passages
+
+
+class NewsIndex:
+    """
+    Incremental BM25 inverted index over every article fetched in the session.
+    Articles are split into passages so that only the relevant ones go to the LLM.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {passage_id: term frequency}
+        self.passages = []                  # passage_id -> {"text", "title", "url"}
+        self.lengths = []                   # passage_id -> token count
+        self.total_length = 0
+        self.urls = set()
+        self._lock = threading.Lock()  # Skills run in the turn pipeline's worker threads
+
+    def __len__(self):
+        return len(self.passages)
+
+    def add_articles(self, articles):
+        """Index articles not seen before (by URL). Returns the number of new passages."""
+        with self._lock:
+            return self._add(articles)
+
+    def _add(self, articles):
+        added = 0
+        for article in articles:
+            url = article.get("url") or article.get("title")
+            if url in self.urls:
+                continue
+            self.urls.add(url)
+            for text in split_passages(article):
+                tokens = tokenize(text)
+                if not tokens:
+                    continue
+                passage_id = len(self.passages)
+                self.passages.append({"text": text, "title": article.get("title") or "", "url": url})
+                self.lengths.append(len(tokens))
+                self.total_length += len(tokens)
+                for term, count in Counter(tokens).items():
+                    self.postings[term][passage_id] = count
+                added += 1
+        return added
+
+    def search(self, query, k=TOP_PASSAGES):
+        """Top-k passages for query as (score, passage) pairs, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            return self._search(terms, k)
+
+    def _search(self, terms, k):
+        return [(score, self.passages[passage_id]) for passage_id, score in self._rank(terms, k)]
+
+    def _rank(self, terms, k):
+        """Top-k (passage_id, BM25 score) pairs. Caller holds _lock."""
+        if not terms or not self.passages:
+            return []
+        n = len(self.passages)
+        average_length = self.total_length / n
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, tf in postings.items():
+                norm = tf + K1 * (1 - B + B * self.lengths[passage_id] / average_length)
+                scores[passage_id] += idf * tf * (K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def coverage(self, query, k=TOP_PASSAGES):
+        """
+        Share of the query's content words that the top-k passages are about (1.0 for no content
+        words): a word counts if it is in one of their titles or recurs in COVERAGE_MIN_PASSAGES
+        of them. A passing mention in a single unrelated article does not count.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 1.0
+        with self._lock:
+            top_ids = [passage_id for passage_id, _ in self._rank(terms, k)]
+            title_terms = set()
+            for passage_id in top_ids:
+                title_terms.update(tokenize(self.passages[passage_id]["title"]))
+            covered = 0
+            for term in terms:
+                postings = self.postings.get(term, {})
+                frequency = sum(passage_id in postings for passage_id in top_ids)
+                if term in title_terms or frequency >= COVERAGE_MIN_PASSAGES:
+                    covered += 1
+        return covered / len(terms)
+
+    def covers(self, query, threshold=COVERAGE_THRESHOLD):
+        """True if the cached articles can answer query without fetching more."""
+        return bool(self.passages) and self.coverage(query) >= threshold
+
+
+def build_passages_context(hits):
+    """Prompt context from search hits, grouped under their article titles."""
+    context = ""
+    for idx, (_, passage) in enumerate(hits, 1):
+        context += f"Passage {idx} (from: {passage['title']}):\n{passage['text']}\n\n"
+    return context
@@ -0,0 +1,142 @@
+# news_store.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# --- News Cache Settings ---
+DB_PATH = os.path.join(os.path.dirname(__file__), "news_data", "news_cache.sqlite3")
+TTL_SECONDS = float(os.getenv("NEWS_CACHE_TTL_SECONDS", "900"))  # Results younger than this are served without a request
+# --- End News Cache Settings ---
+
+_memory = {}  # (endpoint, query, page_size) -> entry dict
+_lock = threading.Lock()
+_db = None
+
+# Session counters, printed in debug lines
+STATS = {"fresh_hits": 0, "revalidated": 0, "fetched": 0}
+
+
+def make_key(endpoint, query, page_size):
+    """Cache key for a NewsAPI request; queries are compared case- and whitespace-insensitively."""
+    return (endpoint, " ".join((query or "").lower().split()), int(page_size))
+
+
+def _connect():
+    """Open (and create) the SQLite store on first use. Caller holds _lock."""
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        _db = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _db.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS queries (
+                endpoint TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page_size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                urls TEXT NOT NULL,
+                PRIMARY KEY (endpoint, query, page_size)
+            );
+        """)
+    return _db
+
+
+def dedupe(articles):
+    """Drop articles whose URL was already seen (syndicated copies), keeping the first."""
+    seen = set()
+    unique = []
+    for article in articles:
+        url = article.get("url") or article.get("title")
+        if url in seen:
+            continue
+        seen.add(url)
+        unique.append(article)
+    return unique
+
+
+def lookup(key):
+    """Return the cached entry for key (memory first, then SQLite) or None. Entries carry fetched_at/etag/last_modified."""
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            return entry
+        try:
+            db = _connect()
+            row = db.execute(
+                "SELECT fetched_at, etag, last_modified, urls FROM queries WHERE endpoint = ? AND query = ? AND page_size = ?",
+                key).fetchone()
+            if row is None:
+                return None
+            urls = json.loads(row[3])
+            stored = dict(db.execute(
+                f"SELECT url, data FROM articles WHERE url IN ({','.join('?' * len(urls))})", urls).fetchall()) if urls else {}
+        except sqlite3.Error as e:
+            print(f"WARN: News cache read failed: {e}")
+            return None
+        entry = {
+            "fetched_at": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "articles": [json.loads(stored[url]) for url in urls if url in stored],
+        }
+        _memory[key] = entry
+        return entry
+
+
+def is_fresh(entry, ttl=TTL_SECONDS):
+    return entry is not None and time.time() - entry["fetched_at"] < ttl
+
+
+def put(key, articles, etag=None, last_modified=None):
+    """Store a fresh result for key in memory and SQLite; articles are deduplicated by URL."""
+    articles = dedupe(articles)
+    entry = {"fetched_at": time.time(), "etag": etag, "last_modified": last_modified, "articles": articles}
+    with _lock:
+        _memory[key] = entry
+        try:
+            db = _connect()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO articles (url, data) VALUES (?, ?)",
+                               [(a.get("url") or a.get("title"), json.dumps(a, ensure_ascii=False)) for a in articles])
+                db.execute("INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (*key, entry["fetched_at"], etag, last_modified,
+                            json.dumps([a.get("url") or a.get("title") for a in articles])))
+        except sqlite3.Error as e:
+            print(f"WARN: News cache write failed: {e}")
+    return entry
+
+
+def touch(key):
+    """Mark a cached entry as fresh again (the server answered 304 Not Modified)."""
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        entry["fetched_at"] = time.time()
+        try:
+            db = _connect()
+            with db:
+                db.execute("UPDATE queries SET fetched_at = ? WHERE endpoint = ? AND query = ? AND page_size = ?",
+                           (entry["fetched_at"], *key))
+        except sqlite3.Error as e:
+            print(f"WARN: News cache write failed: {e}")
+        return entry
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for revalidating a cached entry."""
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
@@ -1,7 +1,8 @@
 import os
 import subprocess
 import tempfile
-from groq import Groq
+import transport
+import llm
 import audio
 from dotenv import load_dotenv # Import load_dotenv
 
@@ -18,7 +19,7 @@ if not GROQ_API_KEY:
 
 # Initialize the Groq client for notepad tasks using the loaded key
 if GROQ_API_KEY: # Only initialize if the key was found
-    client = Groq(api_key=GROQ_API_KEY)
+    client = transport.get_groq_client() # Shared client on the process-wide connection pool
 else:
     # If you chose Option 2 above, handle the missing client here
     # For Option 1 (raising error), this 'else' is not strictly needed
@@ -49,33 +50,38 @@ You are a creative and knowledgeable writer. Generate a detailed, informative, a
 Write in a clear and concise manner, suitable for a notepad summary.
 """
     try: # Add try...except block for API calls
-        response = client.chat.completions.create(
+        content = llm.complete_text(
+            client,
+            site="notepad",
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=500
-        )
-        content = response.choices[0].message.content.strip()
+        ).strip()
         return content
     except Exception as e:
         print(f"ERROR: Failed to generate notepad content via Groq: {e}")
         return f"Error: Failed to generate content. API Error: {e}" # Return an error message
 
 
-def open_and_write_notepad():
+def open_and_write_notepad(topic=None):
     """
     Activates the notepad agent:
       - Announces via audio that notepad mode is active.
-      - Listens for a voice command.
+      - Listens for a voice command (skipped if a topic was already extracted
+        from the triggering utterance).
           * If the command contains "close notepad", it closes the Notepad window.
           * Otherwise, it treats the command as a writing prompt, generates text via Groq,
             writes the text to a temporary file, and opens it in Notepad.
     """
-    # Announce that the notepad agent is active
-    audio.speak("Hey, notepad agent is active. What would you like me to write?")
-    
-    # Listen for a voice command
-    command = audio.listen().strip()
+    if topic:
+        command = topic
+    else:
+        # Announce that the notepad agent is active
+        audio.speak("Hey, notepad agent is active. What would you like me to write?")
+
+        # Listen for a voice command
+        command = audio.listen(mode="dictation").strip()
     if not command:
         audio.speak("I did not catch that. Please try again.")
         return
@@ -0,0 +1,96 @@
+# ocr_service.py
+
+import os
+import gc
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# --- OCR Settings ---
+OCR_LANGUAGES = ['en']
+OCR_GPU = os.getenv("OCR_GPU", "0") == "1"
+OCR_PRELOAD = os.getenv("OCR_PRELOAD", "0") == "1"                     # Load models in the background at startup
+IDLE_UNLOAD_SECONDS = float(os.getenv("OCR_IDLE_UNLOAD_SECONDS", "600"))  # Free the models after this much idle time
+# --- End OCR Settings ---
+
+_requests = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_reader = None
+
+# Session counters, printed in debug lines
+STATS = {"loads": 0, "requests": 0}
+
+
+def _load_reader():
+    """Build the easyocr.Reader (detection + recognition models); slow, done at most once while warm."""
+    global _reader
+    if _reader is None:
+        import easyocr  # Heavy import (torch); only paid by the OCR worker
+        started_at = time.perf_counter()
+        _reader = easyocr.Reader(OCR_LANGUAGES, gpu=OCR_GPU)
+        STATS["loads"] += 1
+        print(f"DEBUG: OCR models loaded in {(time.perf_counter() - started_at) * 1000:.0f} ms")
+    return _reader
+
+
+def _unload_reader():
+    global _reader
+    if _reader is not None:
+        _reader = None
+        gc.collect()
+        print(f"DEBUG: OCR models unloaded after {IDLE_UNLOAD_SECONDS:.0f}s idle.")
+
+
+def _run():
+    """Worker loop: serve queued requests with the resident reader, unload it when idle."""
+    while True:
+        try:
+            job = _requests.get(timeout=IDLE_UNLOAD_SECONDS if _reader is not None else None)
+        except queue.Empty:
+            _unload_reader()
+            continue
+        future, image, kwargs = job
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            reader = _load_reader()
+            if image is None:  # Preload request
+                future.set_result(None)
+            else:
+                future.set_result(reader.readtext(image, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="ocr-worker", daemon=True)
+            _worker.start()
+
+
+def submit(image, **kwargs):
+    """Queue an OCR request (numpy image) and return a Future with easyocr's readtext() result."""
+    _ensure_worker()
+    future = Future()
+    STATS["requests"] += 1
+    _requests.put((future, image, kwargs))
+    return future
+
+
+def readtext(image, timeout=None, **kwargs):
+    """Blocking OCR through the resident reader; same arguments as easyocr.Reader.readtext."""
+    return submit(image, **kwargs).result(timeout)
+
+
+def preload():
+    """Load the models in the background so the first OCR request does not pay for it."""
+    print("INFO: Preloading OCR models in the background...")
+    return submit(None)
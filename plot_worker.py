@@ -0,0 +1,228 @@
+# plot_worker.py
+
+import os
+import sys
+import atexit
+import time
+import queue
+import threading
+import subprocess
+import webbrowser
+import pickle
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# --- Plot Worker Settings ---
+PLOT_TIMEOUT_SECONDS = float(os.getenv("PLOT_TIMEOUT_SECONDS", "20"))   # Wall-clock limit per plot
+PLOT_MEMORY_LIMIT_MB = int(os.getenv("PLOT_MEMORY_LIMIT_MB", "1024"))   # Worker is killed above this RSS
+STARTUP_TIMEOUT_SECONDS = 30   # Time allowed for the worker to import matplotlib/pandas
+POLL_SECONDS = 0.2             # How often the worker checks its memory / the parent checks the worker
+MEMORY_EXIT_CODE = 86          # Worker exit code when it hits the memory limit
+OUTPUT_FILE = os.path.abspath("ai_generated_plot.png")
+# --- End Plot Worker Settings ---
+
+_lock = threading.Lock()
+_process = None
+_results = None
+_ready = False
+_stop_registered = False
+
+
+def _own_rss_mb():
+    """Resident memory of the current process in MB (psutil if available, else peak RSS on POSIX)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def _memory_watchdog(limit_mb):
+    """Worker-side thread: exit hard as soon as the process grows past the memory limit."""
+    while True:
+        rss = _own_rss_mb()
+        if rss is not None and rss > limit_mb:
+            os._exit(MEMORY_EXIT_CODE)
+        time.sleep(POLL_SECONDS)
+
+
+def _serve(memory_limit_mb):
+    """
+    Worker process: import the plotting stack once, then render jobs to PNG files with Agg.
+    Jobs arrive pickled on stdin; results go back pickled on the original stdout, while
+    anything the generated code prints is redirected to stderr.
+    """
+    replies = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    jobs = sys.stdin.buffer
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+    try:
+        import seaborn as sns
+    except ImportError:
+        sns = None
+    import table_extract
+
+    def reply(message):
+        pickle.dump(message, replies)
+        replies.flush()
+
+    threading.Thread(target=_memory_watchdog, args=(memory_limit_mb,), name="plot-memory", daemon=True).start()
+    reply(("ready", True, None))
+
+    while True:
+        try:
+            job = pickle.load(jobs)
+        except EOFError:
+            return
+        if job is None:
+            return
+        job_id, kind, payload, out_path = job
+        try:
+            plt.close("all")
+            if kind == "table":
+                fig, ax = plt.subplots()
+                table_extract.plot_table(payload, ax)
+            else:
+                exec_globals = {"plt": plt, "pd": pd, "sns": sns, "np": np, "__builtins__": __builtins__}
+                exec(payload, exec_globals)
+                fig = plt.gcf()
+                if not fig.get_axes():
+                    reply((job_id, False, "No axes detected in figure. Nothing to plot."))
+                    continue
+            fig.tight_layout()
+            fig.savefig(out_path)
+            reply((job_id, True, out_path))
+        except BaseException as e:  # MemoryError included; the worker stays usable
+            reply((job_id, False, f"{type(e).__name__}: {e}"))
+
+
+def _read_replies(process, results):
+    """Parent-side thread: move pickled worker replies into a queue until the pipe closes."""
+    try:
+        while True:
+            results.put(pickle.load(process.stdout))
+    except (EOFError, OSError, pickle.UnpicklingError):
+        pass
+
+
+def start():
+    """Pre-fork the worker (matplotlib/pandas imported) so the first plot does not pay for it."""
+    global _process, _results, _ready, _stop_registered
+    with _lock:
+        if _process is not None and _process.poll() is None:
+            return
+        if not _stop_registered:
+            atexit.register(stop)  # The worker must not outlive the assistant
+            _stop_registered = True
+        # A plain interpreter running this file, so the worker never re-imports the assistant itself
+        _process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(PLOT_MEMORY_LIMIT_MB)],
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+        _results = queue.Queue()
+        _ready = False
+        threading.Thread(target=_read_replies, args=(_process, _results), name="plot-replies", daemon=True).start()
+        print("INFO: Plot worker starting in the background...")
+
+
+def _kill():
+    """Terminate a hung or oversized worker; the next render pre-forks a fresh one."""
+    global _process
+    if _process is not None:
+        _process.kill()
+        _process.wait(timeout=2)
+        _process = None
+
+
+def _render(kind, payload, out_path, timeout):
+    global _ready
+    start()
+    with _lock:
+        process, results = _process, _results
+    job_id = f"{kind}-{time.perf_counter_ns()}"
+    try:
+        pickle.dump((job_id, kind, payload, out_path), process.stdin)
+        process.stdin.flush()
+    except OSError:
+        with _lock:
+            _kill()
+        return False, "Plot worker is not running."
+
+    # The wall-clock limit starts once the worker has finished its imports
+    deadline = time.monotonic() + (timeout if _ready else STARTUP_TIMEOUT_SECONDS + timeout)
+    while True:
+        try:
+            result_id, ok, detail = results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            result_id = None
+        if result_id == "ready":
+            _ready = True
+            deadline = time.monotonic() + timeout
+            continue
+        if result_id == job_id:
+            return ok, detail
+        if process.poll() is not None:
+            exitcode = process.returncode
+            with _lock:
+                _kill()
+            if exitcode == MEMORY_EXIT_CODE:
+                return False, f"Plot exceeded the memory limit ({PLOT_MEMORY_LIMIT_MB} MB)."
+            return False, "Plot worker exited unexpectedly."
+        if time.monotonic() > deadline:
+            with _lock:
+                _kill()
+            return False, f"Plot timed out after {timeout:.0f}s."
+
+
+def render_code(python_code, out_path=OUTPUT_FILE, timeout=PLOT_TIMEOUT_SECONDS):
+    """Run generated matplotlib code in the worker. Returns (ok, saved path or error message)."""
+    return _render("code", python_code, out_path, timeout)
+
+
+def render_table(df, out_path=OUTPUT_FILE, timeout=PLOT_TIMEOUT_SECONDS):
+    """Plot a reconstructed table (pandas DataFrame) in the worker. Returns (ok, saved path or error message)."""
+    return _render("table", df, out_path, timeout)
+
+
+def display(path):
+    """Open the saved figure in the default image viewer without blocking the assistant."""
+    try:
+        if sys.platform.startswith("win"):
+            os.startfile(path)
+        elif sys.platform == "darwin":
+            subprocess.Popen(["open", path])
+        else:
+            webbrowser.open(f"file://{path}")
+    except Exception as e:
+        print(f"WARN: Could not open '{path}': {e}")
+
+
+def stop():
+    """Ask the worker to exit (called at shutdown)."""
+    with _lock:
+        if _process is not None and _process.poll() is None:
+            try:
+                pickle.dump(None, _process.stdin)
+                _process.stdin.close()
+                _process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                _kill()
+
+
+if __name__ == "__main__":
+    # Started by start(): python plot_worker.py --serve <memory limit MB>
+    if sys.argv[1:2] == ["--serve"]:
+        _serve(int(sys.argv[2]))
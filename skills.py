@@ -0,0 +1,98 @@
+# skills.py
+
+import os
+import sys
+import time
+import importlib
+import subprocess
+
+# category -> handler(user_input, slots, history) -> response text to log (or None)
+HANDLERS = {}
+
+# Categories whose skill runs its own listen() loop and so owns the microphone until it returns
+INTERACTIVE = set()
+
+# Skill modules must not be imported before first use; checked by check_import_budget()
+LAZY_MODULES = [
+    "therapy", "notepad", "close_active_apps", "whatsapp", "news", "zoom",
+    "brightness", "volume", "google_calendar", "open_file", "visualize",
+]
+
+# Cold start budget for "import base" (seconds)
+IMPORT_BUDGET_SECONDS = 1.5
+
+_modules = {}
+
+
+def register(*categories, interactive=False):
+    """
+    Decorator that registers a handler for one or more intent categories.
+    Pass interactive=True if the skill listens for more input itself.
+    """
+    def decorator(handler):
+        for category in categories:
+            HANDLERS[category] = handler
+            if interactive:
+                INTERACTIVE.add(category)
+        return handler
+    return decorator
+
+
+def is_interactive(category):
+    return category in INTERACTIVE
+
+
+def load(module_name):
+    """Import a skill module on first use (its clients are initialized at that point)."""
+    module = _modules.get(module_name)
+    if module is None:
+        started_at = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _modules[module_name] = module
+        print(f"DEBUG: Loaded skill module '{module_name}' in {(time.perf_counter() - started_at) * 1000:.0f} ms")
+    return module
+
+
+def get(module_name, attribute):
+    """Return a function from a skill module, importing the module if needed."""
+    return getattr(load(module_name), attribute)
+
+
+def dispatch(category, user_input, slots, history, default=None):
+    """Run the handler registered for category (or `default`) and return its response text."""
+    handler = HANDLERS.get(category, default)
+    if handler is None:
+        print(f"WARN: No skill registered for category '{category}'.")
+        return None
+    return handler(user_input, slots, history)
+
+
+def check_import_budget(budget=IMPORT_BUDGET_SECONDS):
+    """
+    Measure a cold "import base" in a fresh interpreter.
+    Fails (returns False) if it exceeds the budget or eagerly imports a skill module.
+    """
+    probe = (
+        "import sys, time; t = time.perf_counter(); import base; "
+        "elapsed = time.perf_counter() - t; "
+        f"eager = [m for m in {LAZY_MODULES!r} if m in sys.modules]; "
+        "print('elapsed=%f' % elapsed); print('eager=' + ','.join(eager))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        print(f"❌ 'import base' failed:\n{result.stderr}")
+        return False
+    report = dict(line.split("=", 1) for line in result.stdout.splitlines() if line.startswith(("elapsed=", "eager=")))
+    elapsed, eager = float(report["elapsed"]), [m for m in report["eager"].split(",") if m]
+    print(f"⏱ Cold import of base: {elapsed:.2f}s (budget {budget:.2f}s)")
+    if eager:
+        print(f"❌ Skill modules imported eagerly: {', '.join(eager)}")
+    return elapsed <= budget and not eager
+
+
+if __name__ == "__main__":
+    # Usage: python skills.py --budget   (exit code 1 if cold start regressed)
+    if "--budget" in sys.argv[1:]:
+        sys.exit(0 if check_import_budget() else 1)
+    print("Usage: python skills.py --budget")
@@ -0,0 +1,129 @@
+# table_extract.py
+
+import re
+import numpy as np
+import pandas as pd
+
+# --- Table Reconstruction Settings ---
+ROW_GAP_RATIO = 0.6        # New row when the vertical gap exceeds this fraction of the median box height
+MIN_DATA_ROWS = 2          # Fewer data rows than this is not treated as a table
+MIN_COLUMNS = 2
+NUMERIC_COLUMN_RATIO = 0.6  # Share of parseable cells for a column to count as numeric
+LINE_PLOT_MIN_ROWS = 12     # Long series are drawn as lines instead of bars
+# --- End Table Reconstruction Settings ---
+
+NUMBER_PATTERN = re.compile(r"^\(?[-+]?[$€£¥]?\s*\d[\d,]*(?:\.\d+)?\s*[%kKmMbB]?\)?$")
+SUFFIXES = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+
+def parse_number(text):
+    """Parse an OCR cell like '$1,234.5', '(12)', '45%' or '3.2k' into a float; None if not numeric."""
+    cell = text.strip().replace("−", "-") if text else ""
+    if not cell or not NUMBER_PATTERN.match(cell):
+        return None
+    negative = cell.startswith("(") and cell.endswith(")")
+    cell = cell.strip("()").replace(",", "").replace(" ", "")
+    cell = re.sub(r"[$€£¥%]", "", cell)
+    scale = 1.0
+    if cell[-1:].lower() in SUFFIXES:
+        scale = SUFFIXES[cell[-1].lower()]
+        cell = cell[:-1]
+    try:
+        value = float(cell) * scale
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def _box_geometry(results):
+    """Centers and heights (NumPy arrays) of EasyOCR boxes given as 4 corner points."""
+    corners = np.array([np.asarray(box, dtype=np.float32).reshape(4, 2) for box, _, _ in results])
+    x_min, x_max = corners[:, :, 0].min(axis=1), corners[:, :, 0].max(axis=1)
+    y_min, y_max = corners[:, :, 1].min(axis=1), corners[:, :, 1].max(axis=1)
+    return (x_min + x_max) / 2, (y_min + y_max) / 2, y_max - y_min
+
+
+def cluster_cells(results):
+    """
+    Group EasyOCR readtext(detail=1) results into a grid of strings.
+    Rows are split on vertical gaps; column anchors come from the widest row and every
+    cell is assigned to the nearest anchor by its x center.
+    """
+    if not results:
+        return []
+    x_center, y_center, height = _box_geometry(results)
+    texts = [text for _, text, _ in results]
+    gap = ROW_GAP_RATIO * max(float(np.median(height)), 1.0)
+
+    order = np.argsort(y_center)
+    breaks = np.flatnonzero(np.diff(y_center[order]) > gap) + 1
+    rows = [row[np.argsort(x_center[row])] for row in np.split(order, breaks)]
+    # Single-box lines (titles, menus, captions) are not part of a table
+    rows = [row for row in rows if len(row) >= MIN_COLUMNS]
+    if not rows:
+        return []
+
+    anchors = x_center[max(rows, key=len)]
+    grid = []
+    for row in rows:
+        cells = [""] * len(anchors)
+        columns = np.abs(x_center[row][:, None] - anchors[None, :]).argmin(axis=1)
+        for index, column in zip(row, columns):
+            cells[column] = f"{cells[column]} {texts[index]}".strip()
+        grid.append(cells)
+    return grid
+
+
+def grid_to_dataframe(grid):
+    """Turn a grid of strings into a DataFrame with numeric columns parsed; None if it is not a table."""
+    if len(grid) < MIN_DATA_ROWS or not grid[0] or len(grid[0]) < MIN_COLUMNS:
+        return None
+    parsed = [[parse_number(cell) for cell in row] for row in grid]
+
+    # The first row is a header when it has fewer numbers than the rows below it
+    header_numbers = sum(value is not None for value in parsed[0])
+    body_numbers = max(sum(value is not None for value in row) for row in parsed[1:])
+    has_header = header_numbers < body_numbers
+    body, values = (grid[1:], parsed[1:]) if has_header else (grid, parsed)
+    if len(body) < MIN_DATA_ROWS:
+        return None
+    columns = [cell or f"col{i}" for i, cell in enumerate(grid[0])] if has_header else [f"col{i}" for i in range(len(grid[0]))]
+
+    data = {}
+    for i, name in enumerate(columns):
+        if name in data:
+            name = f"{name}_{i}"
+        cells = [row[i] for row in values]
+        filled = [row[i] for row in body if row[i]]
+        if filled and sum(value is not None for value in cells) / len(filled) >= NUMERIC_COLUMN_RATIO:
+            data[name] = pd.to_numeric(pd.Series(cells, dtype="float64"))
+        else:
+            data[name] = pd.Series([row[i] for row in body], dtype="object")
+    df = pd.DataFrame(data)
+    if not any(pd.api.types.is_numeric_dtype(df[c]) for c in df.columns):
+        return None
+    return df
+
+
+def reconstruct_table(results):
+    """EasyOCR detail=1 results -> pandas DataFrame, or None for unstructured screens."""
+    return grid_to_dataframe(cluster_cells(results))
+
+
+def plot_table(df, ax):
+    """Plot numeric columns against the first text column (or the row order) on ax."""
+    numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    labels = [c for c in df.columns if c not in numeric]
+    if labels:
+        frame = df.set_index(labels[0])[numeric]
+    elif len(numeric) > 1:
+        # All-numeric table: the first column is the x axis (e.g. years)
+        frame = df.set_index(numeric[0])[numeric[1:]]
+    else:
+        frame = df[numeric]
+    kind = "line" if len(frame) >= LINE_PLOT_MIN_ROWS else "bar"
+    frame.plot(kind=kind, ax=ax, legend=len(frame.columns) > 1)
+    if len(frame.columns) == 1:
+        ax.set_ylabel(str(frame.columns[0]))
+    ax.set_title("Table from screen")
+    return ax
@@ -1,23 +1,24 @@
-from groq import Groq
+import transport
 import audio
 import string  # For cleaning punctuation
 import random  # For random greetings
 from exit import is_exit_command
-import os
+import llm
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Initialize the Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Shared Groq client on the process-wide connection pool
+client = transport.get_groq_client()
 
-def get_therapy_response(user_input):
+def get_therapy_response(user_input, stream=False):
     """
     Generate a humanistic, poetic therapy response from AI using a voice-adapted prompt.
 
     Parameters:
       - user_input: The transcribed user input.
+      - stream: If True, return a generator of text deltas instead of a string.
 
     Returns:
       The generated therapist response.
@@ -32,12 +33,17 @@ User: {user_input}
 Therapist:
 """  # UPDATED Prompt
 
-    response = client.chat.completions.create(
+    if stream:
+        return llm.stream_text(client, site="therapy", model="llama-3.3-70b-versatile",
+                               messages=[{"role": "user", "content": prompt}], temperature=1.0)
+
+    return llm.complete_text(
+        client,
+        site="therapy",
         model="llama-3.3-70b-versatile",
         messages=[{"role": "user", "content": prompt}],
         temperature=1.0
-    )
-    return response.choices[0].message.content.strip()
+    ).strip()
 
 def activate_therapy_mode():
     """
@@ -58,7 +64,7 @@ def activate_therapy_mode():
     audio.speak(random.choice(greetings))
 
     while True:
-        user_input = audio.listen().strip()
+        user_input = audio.listen(mode="therapy").strip()
         if not user_input:
             continue  # If transcription fails or is empty, try again
 
@@ -70,6 +76,5 @@ def activate_therapy_mode():
             audio.speak("Alright, I'm always here if you need to talk. Take care.")
             break  # Exit therapy mode and return to base.py
 
-        # Generate the AI therapy response and speak it.
-        ai_response = get_therapy_response(user_input)
-        audio.speak(ai_response)
+        # Generate the AI therapy response and speak it as it streams in.
+        audio.speak_stream(get_therapy_response(user_input, stream=True))
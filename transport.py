@@ -0,0 +1,103 @@
+# transport.py
+
+import os
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# --- Transport Settings ---
+CONNECT_TIMEOUT = 5.0     # Seconds to establish TCP + TLS
+READ_TIMEOUT = 60.0       # Seconds to wait for response data
+MAX_CONNECTIONS = 20      # Total pooled connections (httpx)
+MAX_KEEPALIVE = 10        # Idle connections kept open for reuse (httpx)
+KEEPALIVE_EXPIRY = 120.0  # Seconds an idle connection stays in the pool
+PER_HOST_POOL = 4         # Connections kept per host (requests)
+# --- End Transport Settings ---
+
+_lock = threading.Lock()
+_http_client = None
+_session = None
+_groq_clients = {}
+_openai_clients = {}
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies the default connect/read timeouts when a call gives none."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        return super().send(request, **kwargs)
+
+
+def get_http_client():
+    """Process-wide pooled httpx client, shared by every Groq/OpenAI SDK client."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                    max_keepalive_connections=MAX_KEEPALIVE,
+                                    keepalive_expiry=KEEPALIVE_EXPIRY),
+            )
+        return _http_client
+
+
+def get_session():
+    """Process-wide requests.Session (keep-alive, per-host pools, default timeouts) for plain REST calls."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = _TimeoutHTTPAdapter(pool_connections=PER_HOST_POOL, pool_maxsize=PER_HOST_POOL)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_groq_client(base_url=None):
+    """Shared Groq client (one per base URL) on top of the pooled HTTP client."""
+    from groq import Groq
+    http_client = get_http_client()
+    with _lock:
+        client = _groq_clients.get(base_url)
+        if client is None:
+            kwargs = {"base_url": base_url} if base_url else {}
+            client = Groq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client, **kwargs)
+            _groq_clients[base_url] = client
+        return client
+
+
+def get_openai_client(base_url, api_key):
+    """Shared OpenAI-compatible client for base_url on top of the pooled HTTP client."""
+    from openai import OpenAI
+    http_client = get_http_client()
+    with _lock:
+        client = _openai_clients.get(base_url)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _openai_clients[base_url] = client
+        return client
+
+
+def get_google_http(credentials):
+    """
+    Authorized httplib2 transport with the default timeout, for googleapiclient services.
+    googleapiclient only speaks httplib2, so these calls cannot share the requests/httpx
+    pools above; each service keeps its own keep-alive connection instead.
+    """
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    return AuthorizedHttp(credentials, http=httplib2.Http(timeout=READ_TIMEOUT))
+
+
+def get_google_request():
+    """google-auth transport for token refreshes, on the shared requests session."""
+    from google.auth.transport.requests import Request
+    return Request(session=get_session())
@@ -0,0 +1,143 @@
+# tts_cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Cache Settings ---
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "tts_cache")
+MEMORY_LIMIT_BYTES = 16 * 1024 * 1024   # In-memory LRU budget
+DISK_LIMIT_BYTES = 64 * 1024 * 1024     # On-disk store budget
+MAX_CACHED_TEXT_CHARS = 200             # Longer (usually one-off) utterances are not cached
+
+# Fixed prompts that are synthesized in the background at startup
+STATIC_PHRASES = [
+    "Hey, how's it going?",
+    "Exiting the application. Goodbye!",
+    "Please say the contact name.",
+    "I didn't catch that. Please try again.",
+    "Exiting WhatsApp mode. Take care!",
+    "Hey, notepad agent is active. What would you like me to write?",
+    "Generating your note. Please wait.",
+    "Your note is ready. Opening Notepad.",
+    "Fetching the latest top 3 news headlines for you.",
+    "Here are the top 3 news headlines:",
+    "Okay, leaving news mode now. Goodbye!",
+    "Sure, what event would you like to add?",
+    "Processing your request.",
+    "Please describe the meeting.",
+    "Do you want to send it to someone?",
+    "Sure! What would you like me to retrive ? ",
+]
+# --- End Cache Settings ---
+
+_memory = OrderedDict()   # key -> audio bytes, most recently used last
+_memory_bytes = 0
+_lock = threading.Lock()
+
+
+def cache_key(text, voice, model):
+    """Content address of a synthesized phrase."""
+    return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.wav")
+
+
+def _remember(key, audio_bytes):
+    """Insert into the in-memory LRU, evicting the least recently used entries. Caller holds _lock."""
+    global _memory_bytes
+    if key in _memory:
+        _memory_bytes -= len(_memory.pop(key))
+    _memory[key] = audio_bytes
+    _memory_bytes += len(audio_bytes)
+    while _memory_bytes > MEMORY_LIMIT_BYTES and len(_memory) > 1:
+        _, evicted = _memory.popitem(last=False)
+        _memory_bytes -= len(evicted)
+
+
+def get(text, voice, model):
+    """Return cached audio bytes for (text, voice, model), or None."""
+    key = cache_key(text, voice, model)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+    path = _disk_path(key)
+    try:
+        with open(path, "rb") as f:
+            audio_bytes = f.read()
+        os.utime(path)  # Mark as recently used for disk eviction
+    except OSError:
+        return None
+    with _lock:
+        _remember(key, audio_bytes)
+    return audio_bytes
+
+
+def put(text, voice, model, audio_bytes):
+    """
+    Store synthesized audio in memory (if the text is short enough to be worth it).
+    Only STATIC_PHRASES are written to disk; conversation replies never outlive the session.
+    """
+    if not audio_bytes or len(text) > MAX_CACHED_TEXT_CHARS:
+        return
+    key = cache_key(text, voice, model)
+    with _lock:
+        _remember(key, audio_bytes)
+    if text not in STATIC_PHRASES:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_path = _disk_path(key) + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio_bytes)
+        os.replace(temp_path, _disk_path(key))
+        _trim_disk()
+    except OSError as e:
+        print(f"⚠️ Could not write TTS cache entry: {e}")
+
+
+def _trim_disk():
+    """Delete the least recently used files until the store fits DISK_LIMIT_BYTES."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".wav"):
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= DISK_LIMIT_BYTES:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+            total -= size
+        except OSError:
+            continue
+
+
+def prewarm(synthesize, voice, model):
+    """
+    Synthesize every static phrase that is not cached yet, in a background thread.
+
+    Parameters:
+      - synthesize: function(text) -> audio bytes
+    Returns the started thread.
+    """
+    def worker():
+        warmed = 0
+        for phrase in list(STATIC_PHRASES):
+            if get(phrase, voice, model) is not None:
+                continue
+            try:
+                put(phrase, voice, model, synthesize(phrase))
+                warmed += 1
+            except Exception as e:
+                print(f"⚠️ TTS pre-warm failed for '{phrase}': {e}")
+        print(f"🔥 TTS cache pre-warmed ({warmed} new phrases, {len(STATIC_PHRASES)} registered).")
+
+    thread = threading.Thread(target=worker, name="tts-prewarm", daemon=True)
+    thread.start()
+    return thread
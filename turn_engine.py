@@ -0,0 +1,259 @@
+# turn_engine.py
+
+import os
+import time
+import asyncio
+import audio
+import analysis
+import skills
+
+# --- Turn Engine Settings ---
+ECHO_GUARD_SECONDS = float(os.getenv("ECHO_GUARD_SECONDS", "0.3"))  # Mic stays closed this long after playback ends
+QUEUE_SIZE = 4                                                      # Turns buffered between two stages
+EXIT_MESSAGE = "Exiting the application. Goodbye!"
+# --- End Turn Engine Settings ---
+
+STAGES = ("capture", "stt", "analyze", "skill", "tts", "history")
+
+# Session timings per stage, in milliseconds
+STATS = {stage: {"count": 0, "total_ms": 0.0, "max_ms": 0.0} for stage in STAGES}
+
+
+class Turn:
+    """One user utterance on its way through the stages."""
+
+    def __init__(self, segments, capture_id):
+        self.capture_id = capture_id  # Every captured utterance gets one, usable or not
+        self.number = None          # Assigned once the utterance transcribes to usable text
+        self.segments = segments    # Transcription futures from audio.capture_segments()
+        self.text = ""
+        self.result = None          # analysis.analyze_utterance() output
+        self.speech = None          # Text chunks for the TTS stage (None if the skill spoke itself)
+        self.response_text = None   # Assistant message to log
+        self.timings = {}           # stage -> ms
+
+    def timed(self, stage, started_at):
+        elapsed = (time.perf_counter() - started_at) * 1000
+        self.timings[stage] = elapsed
+        stats = STATS[stage]
+        stats["count"] += 1
+        stats["total_ms"] += elapsed
+        stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def summary(self):
+        return ", ".join(f"{stage} {self.timings[stage]:.0f} ms" for stage in STAGES if stage in self.timings)
+
+
+def stats_summary():
+    """Average and worst time per stage over the session."""
+    return ", ".join(f"{stage} avg {s['total_ms'] / s['count']:.0f} / max {s['max_ms']:.0f} ms"
+                     for stage, s in STATS.items() if s["count"])
+
+
+def _wait_for_quiet():
+    """Echo guard: block until nothing is queued or playing and the room had ECHO_GUARD_SECONDS to settle."""
+    while True:
+        audio.wait_for_speech()
+        quiet = audio.seconds_since_playback()
+        if not audio.is_playing() and quiet >= ECHO_GUARD_SECONDS:
+            return quiet
+        time.sleep(max(0.02, ECHO_GUARD_SECONDS - quiet))
+
+
+def _guarded_frames(frames, state):
+    """Pass mic frames through until our own playback starts."""
+    try:
+        for frame in frames:
+            if audio.is_playing():
+                state["echo"] = True
+                return
+            yield frame
+    finally:
+        frames.close()
+
+
+def capture_utterance():
+    """
+    Wait for quiet, then capture one utterance from the mic (blocking).
+    Returns its segment transcription futures, or None if nothing usable was heard.
+    """
+    quiet = _wait_for_quiet()
+    # The pre-roll must not reach back into our own playback
+    preroll = min(audio.CAPTURE_PREROLL_SECONDS, max(0.0, quiet - ECHO_GUARD_SECONDS))
+    state = {"echo": False}
+    segments = audio.capture_segments(_guarded_frames(audio.iter_mic_frames(preroll_seconds=preroll), state))
+    if state["echo"]:
+        print("DEBUG: Playback started during capture; utterance dropped (echo guard).")
+        return None
+    return segments
+
+
+class TurnEngine:
+    """
+    The main loop as a pipeline of asyncio stages connected by queues:
+    capture -> stt -> analyze -> skill -> tts -> history.
+
+    Each stage handles one turn at a time, so turns stay in order, but different
+    turns can be in different stages: the next utterance is captured while a
+    non-interactive skill runs and its reply is spoken, and history is written
+    off the turn's path. Blocking work runs in worker threads.
+
+    The mic is shared with skills that listen themselves (skills.INTERACTIVE), so
+    capture pauses from the end of an utterance until its analysis shows the skill
+    won't listen, or until such a skill returns. Capture never runs while we speak.
+    """
+
+    def __init__(self, history, default_handler=None, stream_reply=None):
+        self.history = history
+        self.default_handler = default_handler  # Handler for categories without a registered skill
+        self.stream_reply = stream_reply        # (user_input, history) -> text chunks; preferred over default_handler
+        self.turns = 0
+        self.last_persisted = 0
+        self.captures = 0
+        self.mic_owner = None  # capture_id of the turn holding the mic, None while capture may run
+
+    async def run(self):
+        self.mic_free = asyncio.Event()
+        self.mic_free.set()
+        self.persisted = asyncio.Condition()
+        self.done = asyncio.Event()
+
+        queues = [asyncio.Queue(QUEUE_SIZE) for _ in STAGES[1:]]
+        handlers = [self._stt, self._analyze, self._skill, self._tts, self._history]
+        tasks = [asyncio.create_task(self._capture_loop(queues[0]))]
+        for index, (name, handler) in enumerate(zip(STAGES[1:], handlers)):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            tasks.append(asyncio.create_task(self._run_stage(name, handler, queues[index], outbox)))
+
+        try:
+            await self.done.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print(f"⏱ Stage timings: {stats_summary()}")
+
+    async def _capture_loop(self, outbox):
+        while True:
+            await self.mic_free.wait()
+            started_at = time.perf_counter()
+            try:
+                segments = await asyncio.to_thread(capture_utterance)
+            except Exception as e:
+                print(f"ERROR in turn stage 'capture': {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not segments:
+                continue
+            self.mic_free.clear()
+            self.captures += 1
+            self.mic_owner = self.captures
+            turn = Turn(segments, self.captures)
+            turn.timed("capture", started_at)
+            await outbox.put(turn)
+
+    async def _run_stage(self, name, handler, inbox, outbox):
+        while True:
+            turn = await inbox.get()
+            started_at = time.perf_counter()
+            try:
+                result = await handler(turn)
+            except Exception as e:
+                print(f"ERROR in turn stage '{name}': {e}")
+                await self._abandon(turn)
+                continue
+            if result is None:
+                continue
+            turn.timed(name, started_at)
+            if outbox is None:
+                print(f"⏱ Turn {turn.number}: {turn.summary()}")
+                if turn.result["exit"]:
+                    self.done.set()
+            else:
+                await outbox.put(turn)
+
+    async def _abandon(self, turn):
+        """Unblock the pipeline after a stage failed on turn."""
+        if turn.result and turn.result["exit"]:
+            self.done.set()
+        self._release_mic(turn)
+        if turn.number is not None:
+            await self._mark_persisted(turn.number)
+
+    def _release_mic(self, turn):
+        """Reopen capture, but only if turn holds the mic (a later interactive skill may own it)."""
+        if self.mic_owner == turn.capture_id:
+            self.mic_owner = None
+            self.mic_free.set()
+
+    async def _mark_persisted(self, number):
+        async with self.persisted:
+            self.last_persisted = max(self.last_persisted, number)
+            self.persisted.notify_all()
+
+    async def _stt(self, turn):
+        texts = [await asyncio.wrap_future(future) for future in turn.segments]
+        turn.text = audio.clean_transcript(audio.join_segments(texts))
+        if not turn.text:
+            self._release_mic(turn)
+            return None
+        self.turns += 1
+        turn.number = self.turns
+        return turn
+
+    async def _analyze(self, turn):
+        turn.result = await asyncio.to_thread(analysis.analyze_utterance, turn.text)
+        category = turn.result["category"]
+        print(f"DEBUG: category={category} (source={turn.result['source']})")
+        if not turn.result["exit"] and not skills.is_interactive(category):
+            # The skill won't listen itself, so the next utterance can be captured while it runs
+            self._release_mic(turn)
+        return turn
+
+    async def _skill(self, turn):
+        # Skills see the history of every earlier turn
+        async with self.persisted:
+            await self.persisted.wait_for(lambda: self.last_persisted >= turn.number - 1)
+
+        if turn.result["exit"]:
+            turn.speech = [EXIT_MESSAGE]
+            return turn
+
+        category = turn.result["category"]
+        if category not in skills.HANDLERS and self.stream_reply is not None:
+            # Spoken by the TTS stage as it streams in
+            turn.speech = self.stream_reply(turn.text, self.history)
+        else:
+            turn.response_text = await asyncio.to_thread(
+                skills.dispatch, category, turn.text, turn.result["slots"], self.history, self.default_handler)
+        if skills.is_interactive(category):
+            self._release_mic(turn)
+        return turn
+
+    async def _tts(self, turn):
+        if turn.speech is not None:
+            turn.response_text = await asyncio.to_thread(audio.speak_stream, turn.speech)
+        return turn
+
+    async def _history(self, turn):
+        category = turn.result["category"]
+        messages = [{"role": "user", "content": turn.text}]
+        # Therapy keeps its own conversation out of the log
+        if turn.response_text is not None and (turn.result["exit"] or category != "therapy"):
+            messages.append({"role": "assistant", "content": turn.response_text})
+        elif category != "therapy":
+            print(f"INFO: No assistant response generated or logged for category '{category}'. Only the user message was logged.")
+        await asyncio.to_thread(self._persist, messages, turn.result["exit"])
+        await self._mark_persisted(turn.number)
+        return turn
+
+    def _persist(self, messages, close):
+        for message in messages:
+            self.history.append(message)
+        if close:
+            self.history.close()  # Flush history to disk before exiting
+
+
+def run(history, default_handler=None, stream_reply=None):
+    """Run turns until the user exits."""
+    asyncio.run(TurnEngine(history, default_handler, stream_reply).run())
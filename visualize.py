@@ -6,23 +6,17 @@ import time
 import mss
 import cv2
 import numpy as np
-from openai import OpenAI # Make sure OpenAI is imported correctly
-from PIL import Image
-import io
+import transport
+import llm
 import audio
 import pygetwindow as gw
-import easyocr
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import ocr_service
+import table_extract
+import plot_worker
 import re
-import matplotlib
 
 from dotenv import load_dotenv
 
-# Set Matplotlib backend for GUI window
-matplotlib.use('TkAgg')
-
 # Load environment variables from .env file
 load_dotenv()
 
@@ -30,54 +24,95 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not found in environment variables.")
-# Create the client instance using the Groq endpoint
-client = OpenAI( # Use the imported OpenAI class
-    api_key=GROQ_API_KEY,
-    base_url="https://api.groq.com/openai/v1"
-)
+# Create the client instance using the Groq endpoint (shared connection pool)
+client = transport.get_openai_client("https://api.groq.com/openai/v1", GROQ_API_KEY)
 # Remove the old configuration lines:
 # openai.api_key = GROQ_API_KEY  <- Remove this
 # openai.api_base = "https://api.groq.com/openai/v1" <- Remove this
 
 MODEL_NAME = "llama3-70b-8192"
 
-def capture_active_window():
-    """Capture the active window or full screen."""
-    time.sleep(2)
+# --- Capture Settings ---
+CAPTURE_DELAY_SECONDS = float(os.getenv("VISUALIZE_CAPTURE_DELAY", "2.0"))  # Time to bring the target window forward
+CAPTURE_DOWNSCALE = max(1, int(os.getenv("VISUALIZE_DOWNSCALE", "1")))      # Keep every Nth pixel (1 = full size)
+CAPTURE_CROP = tuple(int(v) for v in os.getenv("VISUALIZE_CROP", "").split(",") if v.strip()) or None  # "left,top,right,bottom"
+DEBUG_CAPTURE = os.getenv("VISUALIZE_DEBUG", "0") == "1"                   # Save debug_screenshot.png
+# --- End Capture Settings ---
+
+def capture_active_window(delay=None, crop=None, downscale=None):
+    """
+    Capture the active window (or full screen) as a NumPy BGR view over the mss buffer.
+    crop is an optional (left, top, right, bottom) box in captured pixels and downscale an
+    integer stride; both are applied by slicing, so no pixel data is copied.
+    """
+    time.sleep(CAPTURE_DELAY_SECONDS if delay is None else delay)
     active_window = gw.getActiveWindow()
-    
-    if not active_window:
-        audio.speak("\n⚠️ No active window detected! Capturing full screen instead.")
-        with mss.mss() as sct:
-            monitor = sct.monitors[1]
-            screenshot = sct.grab(monitor)
-    else:
-        bbox = (active_window.left, active_window.top, active_window.right, active_window.bottom)
-        with mss.mss() as sct:
+
+    with mss.mss() as sct:
+        if not active_window:
+            audio.speak("\n⚠️ No active window detected! Capturing full screen instead.")
+            screenshot = sct.grab(sct.monitors[1])
+        else:
+            bbox = (active_window.left, active_window.top, active_window.right, active_window.bottom)
             screenshot = sct.grab(bbox)
 
-    img = np.array(screenshot)
-    img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGB)
-    pil_image = Image.fromarray(img)
+    # BGRA pixels straight from the grab buffer; dropping alpha leaves the BGR layout easyocr expects
+    img = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)[:, :, :3]
+    crop = crop if crop is not None else CAPTURE_CROP
+    if crop:
+        left, top, right, bottom = crop
+        img = img[top:bottom, left:right]
+    step = downscale or CAPTURE_DOWNSCALE
+    if step > 1:
+        img = img[::step, ::step]
 
-    pil_image.save("debug_screenshot.png")
-    print("\n📷 Screenshot saved as 'debug_screenshot.png'.")
+    if DEBUG_CAPTURE:
+        cv2.imwrite("debug_screenshot.png", img)
+        print("\n📷 Screenshot saved as 'debug_screenshot.png'.")
 
-    return pil_image
+    return img
 
-def extract_text_from_image(image_pil):
-    """Extract text from a PIL image using EasyOCR."""
+def read_screen(image):
+    """Run EasyOCR on a screenshot (NumPy BGR array or PIL image); returns (box, text, confidence) tuples."""
     print("[INFO] Extracting text from image...")
-    reader = easyocr.Reader(['en'], gpu=False)
-    image_np = np.array(image_pil)
-    results = reader.readtext(image_np, detail=0)
-    extracted_text = "\n".join(results)
+    image_np = np.asarray(image)  # No copy for NumPy input
+    # Models stay resident in the OCR worker, so only the first request pays the load
+    results = ocr_service.readtext(image_np, detail=1)
     print("[INFO] OCR extraction complete.")
-    return extracted_text
-
-def generate_and_execute_plot(image_pil):
-    """Generate Python plotting code from Groq and execute it."""
-    extracted_text = extract_text_from_image(image_pil)
+    return results
+
+def extract_text_from_image(image, results=None):
+    """Extract text from a screenshot using EasyOCR, one detected box per line."""
+    if results is None:
+        results = read_screen(image)
+    return "\n".join(text for _, text, _ in results)
+
+def show_plot(ok, detail):
+    """Open a plot rendered by the worker without blocking, or report why it failed."""
+    if ok:
+        print(f"[INFO] Plot saved as '{detail}'. Displaying...")
+        plot_worker.display(detail)
+    else:
+        print(f"[ERROR] Plot rendering failed: {detail}")
+    return ok
+
+def plot_table_directly(results):
+    """Rebuild a table from the OCR boxes and plot it without the LLM. Returns False if no table was found."""
+    df = table_extract.reconstruct_table(results)
+    if df is None:
+        return False
+    print(f"[INFO] Reconstructed a {df.shape[0]}x{df.shape[1]} table from OCR boxes; plotting directly.")
+    return show_plot(*plot_worker.render_table(df))
+
+def generate_and_execute_plot(image):
+    """Plot a table found on screen directly; otherwise generate plotting code with Groq and execute it."""
+    results = read_screen(image)
+    try:
+        if plot_table_directly(results):
+            return
+    except Exception as e:
+        print(f"[WARNING] Direct table plot failed, falling back to Groq: {e}")
+    extracted_text = extract_text_from_image(image, results)
 
     prompt = f"""
 You are a Python expert.
@@ -98,7 +133,9 @@ Write clean Python code that uses Matplotlib (and optionally Pandas) to plot thi
     print("[INFO] Sending prompt to Groq...")
     try:
         # --- Use the client to make the call ---
-        response = client.chat.completions.create( # Use client.chat.completions.create
+        reply_content = llm.complete_text(
+            client,
+            site="visualize",
             model=MODEL_NAME,
             messages=[
                 {"role": "system", "content": "You are a helpful AI assistant that writes clean plotting code."},
@@ -106,11 +143,9 @@ Write clean Python code that uses Matplotlib (and optionally Pandas) to plot thi
             ],
             temperature=0.2,
         )
-        # --- Access the response content correctly ---
-        reply_content = response.choices[0].message.content
     except Exception as api_error:
          print(f"[ERROR] Groq API call failed: {api_error}")
-         reply_content = response['choices'][0]['message']['content']
+         reply_content = None
 
     if reply_content:
         try:
@@ -153,30 +188,11 @@ Write clean Python code that uses Matplotlib (and optionally Pandas) to plot thi
                 except Exception as fix_error:
                     print(f"[WARNING] Auto-fix failed: {fix_error}")
 
-            # Execute the code safely
-            exec_globals = {
-                "plt": plt,
-                "pd": pd,
-                "sns": sns,
-                "np": np,
-                "__builtins__": __builtins__,
-            }
-
+            # Execute the code in the plot worker, under its time and memory limits
             print("[INFO] Executing generated plotting code...")
-            exec(python_code, exec_globals)
-            print("[INFO] Code executed.")
-
-            fig = plt.gcf()
-            if fig.get_axes():
-                print("[INFO] Plot created successfully. Displaying...")
-                fig.canvas.manager.set_window_title('📊 Navable - AI Generated Plot')
-                plt.tight_layout()
-                plt.show()
-
-                fig.savefig('ai_generated_plot.png')
-                print("[INFO] Plot saved as 'ai_generated_plot.png'.")
-            else:
-                print("[WARNING] No axes detected in figure. Nothing to plot.")
+            ok, detail = plot_worker.render_code(python_code)
+            if not show_plot(ok, detail):
+                audio.speak("⚠️ I couldn't draw that chart.")
 
         except Exception as e:
             print(f"[ERROR] Error executing generated code: {e}")
@@ -187,6 +203,8 @@ Write clean Python code that uses Matplotlib (and optionally Pandas) to plot thi
 
 def visualize_mod():
     """Main function to capture screen and visualize."""
+    # Pre-fork the plot worker now; it imports matplotlib/pandas while the screen is captured and read
+    plot_worker.start()
     audio.speak("📸 capturing the screen...")
     screen_img = capture_active_window()
     generate_and_execute_plot(screen_img)
@@ -60,10 +60,11 @@ def send_whatsapp_message(contact, message):
     else:
         print("Failed to open WhatsApp.")
 
-def activate_whatsapp_mode():
+def activate_whatsapp_mode(contact_name=None):
     """
     Voice-based flow to send a WhatsApp message:
-      - Prompt user (via TTS) for contact name
+      - Prompt user (via TTS) for contact name, unless one was already
+        extracted from the triggering utterance
       - Listen for contact name
       - Prompt user for message
       - Listen for message
@@ -74,9 +75,10 @@ def activate_whatsapp_mode():
     # audio.speak("WhatsApp mode activated. Please tell me the contact name you want to message. Say 'stop' at any time to exit.")
 
     while True:
-        # 2. Listen for contact name
-        audio.speak("Please say the contact name.")
-        contact_name = audio.listen().strip()
+        # 2. Listen for contact name unless we already have one
+        if not contact_name:
+            audio.speak("Please say the contact name.")
+            contact_name = audio.listen().strip()
         
         # Check for exit command
         if is_exit_command(contact_name):
@@ -89,7 +91,7 @@ def activate_whatsapp_mode():
         
         # Prompt for the message
         audio.speak(f"Contact name is {contact_name}. Now please say your message.")
-        message_text = audio.listen().strip()
+        message_text = audio.listen(mode="dictation").strip()
         
         # Check for exit command
         if is_exit_command(message_text):
@@ -101,7 +103,8 @@ def activate_whatsapp_mode():
             continue
         
         # 3. Send the message
-        audio.speak(f"Sending your message to {contact_name}. Please wait.")
+        # Queued, so WhatsApp opens while the confirmation is spoken
+        audio.enqueue_speech(f"Sending your message to {contact_name}. Please wait.")
         send_whatsapp_message(contact_name, message_text)
         
         audio.speak(f"Your message to {contact_name} was sent successfully.")
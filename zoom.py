@@ -1,13 +1,14 @@
-import requests
 import json
 import os
 import subprocess
 import pyautogui
 import time
+import threading
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-from groq import Groq
 import audio
+import transport
+import llm
 
 # 🔹 Load environment variables
 load_dotenv()
@@ -16,7 +17,7 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("❌ GROQ_API_KEY not found in environment variables.")
-client = Groq(api_key=GROQ_API_KEY)
+client = transport.get_groq_client()
 
 # 🔹 Zoom OAuth Credentials
 CLIENT_ID = os.getenv("ZOOM_CLIENT_ID")
@@ -25,52 +26,155 @@ ACCOUNT_ID = os.getenv("ZOOM_ACCOUNT_ID")
 if not all([CLIENT_ID, CLIENT_SECRET, ACCOUNT_ID]):
     raise ValueError("❌ Zoom credentials missing in environment variables.")
 
-# 🔹 Zoom API endpoints
-TOKEN_URL = f"https://zoom.us/oauth/token?grant_type=account_credentials&account_id={ACCOUNT_ID}"
+# 🔹 Zoom API endpoints (overridable, e.g. to point at a local fake server)
+ZOOM_OAUTH_BASE = os.getenv("ZOOM_OAUTH_BASE", "https://zoom.us").rstrip("/")
+ZOOM_API_BASE = os.getenv("ZOOM_API_BASE", "https://api.zoom.us/v2").rstrip("/")
+TOKEN_URL = f"{ZOOM_OAUTH_BASE}/oauth/token?grant_type=account_credentials&account_id={ACCOUNT_ID}"
 TOKEN_FILE = "zoom_token.json"
+REFRESH_MARGIN_SECONDS = 300  # Refresh the token this long before it expires
+RETRY_SECONDS = 30            # Retry delay after a failed background refresh
 
-def fetch_new_token():
-    """Fetch a new OAuth token from Zoom and save it to a file."""
-    response = requests.post(TOKEN_URL, auth=(CLIENT_ID, CLIENT_SECRET))
-    if response.status_code == 200:
-        token_data = response.json()
-        expiry_time = datetime.utcnow().replace(tzinfo=timezone.utc) + timedelta(seconds=token_data["expires_in"])
-        token_data["expiry_time"] = expiry_time.isoformat()
-        with open(TOKEN_FILE, "w") as file:
+# 🔹 In-memory token state, shared with the background refresh timer
+_token_lock = threading.RLock()
+_token_data = None
+_refresh_timer = None
+_user_id = None
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _save_token_file(token_data):
+    """Write the token file atomically so a crash never leaves it half-written."""
+    tmp_path = TOKEN_FILE + ".tmp"
+    try:
+        with open(tmp_path, "w") as file:
             json.dump(token_data, file)
+        os.replace(tmp_path, TOKEN_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not save Zoom token file: {e}")
+
+
+def _load_token_file():
+    """Read the token file once at first use; returns None if missing or invalid."""
+    if not os.path.exists(TOKEN_FILE):
+        return None
+    try:
+        with open(TOKEN_FILE, "r") as file:
+            token_data = json.load(file)
+        if not token_data.get("expiry_time"):
+            print("⚠️ Token file exists but expiry_time is missing. Fetching new token.")
+            return None
+        datetime.fromisoformat(token_data["expiry_time"])
+        token_data["access_token"]
         return token_data
-    else:
+    except (json.JSONDecodeError, KeyError, ValueError):
+        print("⚠️ Corrupted or invalid token file. Fetching new token.")
+        return None
+
+
+def _schedule_refresh(delay):
+    """(Re)arm the background timer that refreshes the token before it expires."""
+    global _refresh_timer
+    if _refresh_timer is not None:
+        _refresh_timer.cancel()
+    _refresh_timer = threading.Timer(max(0.0, delay), _background_refresh)
+    _refresh_timer.daemon = True
+    _refresh_timer.start()
+
+
+def _store_token(token_data):
+    """Keep the token in memory, persist it and schedule its proactive refresh."""
+    global _token_data
+    with _token_lock:
+        if _user_id:
+            token_data["user_id"] = _user_id
+        _token_data = token_data
+        _save_token_file(token_data)
+        expiry_time = datetime.fromisoformat(token_data["expiry_time"])
+        _schedule_refresh((expiry_time - _utcnow()).total_seconds() - REFRESH_MARGIN_SECONDS)
+
+
+def _request_token():
+    """POST to the OAuth endpoint. Returns the token dict with expiry_time, or None on failure."""
+    try:
+        response = transport.get_session().post(TOKEN_URL, auth=(CLIENT_ID, CLIENT_SECRET))
+    except Exception as e:
+        print(f"❌ Error fetching new token: {e}")
+        return None
+    if response.status_code != 200:
         print("❌ Error fetching new token:", response.text)
-        exit(1)
+        return None
+    token_data = response.json()
+    expiry_time = _utcnow() + timedelta(seconds=token_data["expires_in"])
+    token_data["expiry_time"] = expiry_time.isoformat()
+    return token_data
+
+
+def _background_refresh():
+    """Timer callback: fetch a fresh token ahead of expiry, retrying later on failure."""
+    token_data = _request_token()
+    if token_data is None:
+        with _token_lock:
+            _schedule_refresh(RETRY_SECONDS)
+        return
+    _store_token(token_data)
+    print("DEBUG: Zoom access token refreshed in the background.")
+
+
+def fetch_new_token():
+    """Fetch a new OAuth token from Zoom, keep it in memory and save it to a file. Returns None on failure."""
+    token_data = _request_token()
+    if token_data is None:
+        return None
+    _store_token(token_data)
+    return token_data
+
 
 def get_access_token():
-    """Retrieve a valid access token, fetching a new one if needed."""
-    if os.path.exists(TOKEN_FILE):
-        try:
-            with open(TOKEN_FILE, "r") as file:
-                token_data = json.load(file)
-            expiry_time_str = token_data.get("expiry_time", None)
-            if expiry_time_str:
-                expiry_time = datetime.fromisoformat(expiry_time_str)
-                if datetime.utcnow().replace(tzinfo=timezone.utc) < expiry_time:
-                    return token_data["access_token"]
-            else:
-                print("⚠️ Token file exists but expiry_time is missing. Fetching new token.")
-        except (json.JSONDecodeError, KeyError):
-            print("⚠️ Corrupted or invalid token file. Fetching new token.")
-    return fetch_new_token()["access_token"]
+    """
+    Return a valid access token from memory, loading the token file or fetching a new one if needed.
+    Returns None if no token could be obtained.
+    """
+    global _token_data, _user_id
+    with _token_lock:
+        if _token_data is None:
+            _token_data = _load_token_file()
+            if _token_data is not None:
+                _user_id = _user_id or _token_data.get("user_id")
+                expiry_time = datetime.fromisoformat(_token_data["expiry_time"])
+                # An already expired token is replaced right below; a timer would only fetch it twice
+                if expiry_time > _utcnow():
+                    _schedule_refresh((expiry_time - _utcnow()).total_seconds() - REFRESH_MARGIN_SECONDS)
+        if _token_data is not None and _utcnow() < datetime.fromisoformat(_token_data["expiry_time"]):
+            return _token_data["access_token"]
+        token_data = fetch_new_token()
+        return token_data["access_token"] if token_data else None
+
 
 def get_user_id():
-    """Fetches the Zoom user ID associated with the app credentials."""
-    access_token = get_access_token()
+    """Fetches the Zoom user ID associated with the app credentials (memoized; it never changes)."""
+    global _user_id
+    access_token = get_access_token()  # Also picks up a user id persisted in the token file
+    if access_token is None:
+        return None
+    with _token_lock:
+        if _user_id:
+            return _user_id
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
-    response = requests.get("https://api.zoom.us/v2/users/me", headers=headers)
+    response = transport.get_session().get(f"{ZOOM_API_BASE}/users/me", headers=headers)
     if response.status_code == 200:
         user_info = response.json()
-        return user_info["id"]
+        with _token_lock:
+            _user_id = user_info["id"]
+            if _token_data is not None:
+                _token_data["user_id"] = _user_id
+                _save_token_file(_token_data)
+        return _user_id
     else:
         print("❌ Failed to get user ID:", response.text)
         return None
@@ -93,18 +197,20 @@ User Input: {user_input}
 Output:
     """
     try:
-        response = client.chat.completions.create(
+        output = llm.complete_text(
+            client,
+            site="zoom",
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.0,
             max_tokens=50
         )
 
-        if not response or not response.choices:
+        if not output:
             print("❌ ERROR: Empty response from Groq.")
             return None
 
-        output = response.choices[0].message.content.strip()
+        output = output.strip()
         print(f"DEBUG: Groq Response: {output}")
 
         # 🛠 Clean triple backticks if any
@@ -144,20 +250,16 @@ Output:
 
 def schedule_zoom_meeting():
     """Schedule a Zoom meeting using meeting details parsed via Groq."""
-    access_token = get_access_token()
     user_id = get_user_id()
     if not user_id:
         print("❌ Cannot schedule meeting without User ID.")
+        audio.speak("I couldn't sign in to Zoom right now. Please try again later.")
         return None
 
-    meeting_url = f"https://api.zoom.us/v2/users/{user_id}/meetings"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
+    meeting_url = f"{ZOOM_API_BASE}/users/{user_id}/meetings"
 
     audio.speak("Please describe the meeting.")
-    user_input = audio.listen().strip()
+    user_input = audio.listen(mode="dictation").strip()
 
     meeting_details = parse_meeting_command_groq(user_input)
     if not meeting_details:
@@ -194,7 +296,16 @@ def schedule_zoom_meeting():
         }
     }
 
-    response = requests.post(meeting_url, headers=headers, data=json.dumps(meeting_payload))
+    # Token comes from memory (refreshed in the background), so this is the only Zoom call
+    access_token = get_access_token()
+    if access_token is None:
+        audio.speak("I couldn't sign in to Zoom right now. Please try again later.")
+        return None
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
+    response = transport.get_session().post(meeting_url, headers=headers, data=json.dumps(meeting_payload))
     if response.status_code == 201:
         meeting_info = response.json()
         zoom_details = {